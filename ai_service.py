@@ -1,177 +1,328 @@
 import base64
-import io
+import functools
+import json
 import os
-import tempfile
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import google.generativeai as genai
-import pytesseract
-from gtts import gTTS
-from langdetect import detect
-from PIL import Image
-
-from config import ALLOWED_SUBJECTS, GEMINI_API_KEY
+from audio_cache import AudioCache
+from chat_sessions import ChatSessionPool, estimate_tokens, transcript
+from config import ALLOWED_SUBJECTS, GRADING_WORKERS, QUESTION_BANK_PATH
+from image_ingest import ImageIngestor
+from llm_backends import open_llm_backend
+from ocr import OCREngine
+from question_bank import QuestionBank
+from rate_limiter import CHAT, GENERATION, GRADING, PREFETCH, RateLimiter
+from response_cache import ResponseCache, cache_key
+from speech import SpeechPipeline
+from tts_backends import TTSRouter, open_tts_backends
 
 
 class AITutorService:
-    def __init__(self):
-        # Configure Gemini API
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
-        self.vision_model = genai.GenerativeModel('gemini-1.5-pro-vision')
-        
-        # Initialize empty chat sessions dict
-        self.chat_sessions = {}
-
-    def get_chat_session(self, subject):
-        """Get or create a chat session for the given subject"""
-        if subject not in self.chat_sessions:
-            # Initialize new chat session
-            self.chat_sessions[subject] = self.model.start_chat(history=[])
-            
-            # Set up the initial context
-            prompt = f"""You are an expert tutor in {subject}. Your role is to:
-            1. Help students understand concepts clearly
-            2. Provide practical examples
-            3. Answer questions patiently
-            4. Give constructive feedback
-            5. Encourage learning through practice
-            
-            Please maintain a friendly and supportive tone while being professional."""
-            self.chat_sessions[subject].send_message(prompt)
-            
-        return self.chat_sessions[subject]
+    def __init__(self, backend=None, response_cache=None, question_bank_path=QUESTION_BANK_PATH, audio_cache=None,
+                 tts_backends=None):
+        # Gemini by default; LLM_BACKEND=stub runs fully offline
+        self.backend = backend or open_llm_backend()
+
+        # Every model call waits for a token; chat goes first, background prefetch last
+        self.limiter = RateLimiter()
+
+        # Chat sessions per (student, subject), evicted when idle or over the memory budget
+        # and with older exchanges folded into a rolling summary
+        self.chat_sessions = ChatSessionPool(self._start_chat_session, self._summarize_chat)
+
+        # Uploads are validated, downscaled and deduplicated before the vision model sees them
+        self.images = ImageIngestor()
+        # Preprocessed, cached OCR of uploaded pages
+        self.ocr = OCREngine()
+
+        # Answers shared across students asking the same question
+        self.response_cache = response_cache or ResponseCache()
+
+        # Spoken answers, synthesized once per distinct text and voice
+        self.audio_cache = audio_cache or AudioCache()
+        # Local speech engines first when installed, gTTS otherwise
+        self.tts = TTSRouter(open_tts_backends() if tts_backends is None else tts_backends, self.audio_cache)
+
+        # Answers are spoken in sentence chunks synthesized concurrently
+        self.speech = SpeechPipeline(self.text_to_speech, self.audio_cache)
+
+        # Pre-generated practice questions, topped up in the background
+        self.question_bank = QuestionBank(functools.partial(self._generate_questions, priority=PREFETCH),
+                                          question_bank_path)
+
+    def close(self):
+        """Stop the OCR worker processes and the background question bank refills"""
+        self.ocr.close()
+        self.question_bank.close()
+
+    def get_chat_session(self, subject, student_id=None):
+        """Get or create the student's chat session for the given subject"""
+        return self.chat_sessions.get(student_id, subject)
+
+    def _start_chat_session(self, subject):
+        """Start a chat session with the tutor role as its system instruction"""
+        return self.backend.start_chat(system_instruction=_tutor_instruction(subject))
+
+    def _summarize_chat(self, summary, messages):
+        """Fold older chat messages into the rolling summary of the conversation"""
+        prompt = f"""Update the summary of a tutoring conversation with the new messages below.
+        Keep what the student is working on, what they found difficult, and any facts,
+        answers or preferences later replies depend on. Use at most 150 words.
+
+        Current summary:
+        {summary or "(none)"}
+
+        New messages:
+        {transcript(messages)}
+
+        Reply with the updated summary only."""
+        self.limiter.acquire(CHAT)
+        return self.backend.generate(prompt).text.strip()
 
     def process_image(self, image_file):
-        """Extract text from an image using OCR"""
-        img = Image.open(image_file)
-        text = pytesseract.image_to_string(img)
-        return text
+        """Extract text from an image using OCR: ``{"text", "confidence", "words", "skew"}``"""
+        return self.process_images([image_file])[0]
+
+    def process_images(self, image_files):
+        """OCR several pages at once, spread over worker processes"""
+        pages = []
+        for image_file in image_files:
+            data = self.images.read(image_file)
+            self.images.sniff(data)
+            pages.append(data)
+        return self.ocr.recognize_batch(pages)
 
     def encode_image(self, image_file):
         """Encode image for Gemini API"""
-        if isinstance(image_file, str):
-            with open(image_file, "rb") as f:
-                image_bytes = f.read()
-        else:
-            image_file.seek(0)
-            image_bytes = image_file.read()
-
-        return {"mime_type": "image/jpeg", "data": base64.b64encode(image_bytes).decode("utf-8")}
+        image = self.images.ingest(image_file)
+        return {"mime_type": image.mime_type, "data": base64.b64encode(image.data).decode("utf-8")}
 
     def detect_language(self, text):
         """Detect the language of input text"""
+        from langdetect import detect
+
         try:
             return detect(text)
         except:
             return "en"  # Default to English if detection fails
 
+    def speak(self, text, language="en"):
+        """Convert a whole answer to speech, synthesizing its sentence chunks in parallel"""
+        return self.speech.speak(text, language).audio_file()
+
     def text_to_speech(self, text, language="en"):
-        """Convert text to speech"""
-        speech = gTTS(text=text, lang=language, slow=False)
-        fp = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        speech.save(fp.name)
-        return fp.name
-
-    def ask_question(self, question, subject, grade_level, image_file=None, language="en"):
-        """Ask a question and get a response"""
+        """Convert text to speech, returning the path of a cached audio file"""
+        return self.tts.speak(text, language)
+
+    def ask_question(self, question, subject, grade_level, image_file=None, language="en", student_id=None):
+        """Ask a question and get a response, served from the response cache when possible"""
+        stream = self.stream_question(question, subject, grade_level, image_file, language, student_id)
+        for _ in stream:
+            pass
+        return {
+            "text_response": stream.text,
+            "audio_file": stream.audio_file
+        }
+
+    def stream_question(self, question, subject, grade_level, image_file=None, language="en", student_id=None):
+        """Ask a question and get a ``TutorStream`` that yields the response text as it arrives"""
+        stream = TutorStream()
+        stream.chunks = self._stream_answer(stream, question, subject, grade_level, image_file, language, student_id)
+        return stream
+
+    def _stream_answer(self, stream, question, subject, grade_level, image_file, language, student_id):
+        """Yield response chunks, then fill in the full text and audio of ``stream``"""
+        parts = []
+        # Spoken answers are synthesized sentence by sentence while the text streams in
+        speech = self.speech.start(language, stream.started) if language != "en" else None
+        # Exposed right away so the first chunk can play before the text is complete
+        stream.speech = speech
+        chatting = False  # Whether a reply is streaming into the student's chat session
         try:
-            if image_file:
-                # Handle image upload
-                image = Image.open(image_file)
-                response = self.vision_model.generate_content([question, image])
-                text_response = response.text
+            key, image = self._answer_key(question, subject, grade_level, image_file, language, student_id)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                stream.cached = True
+                stream.first_chunk_latency = time.perf_counter() - stream.started
+                if not image:
+                    # The next question in the conversation may refer back to this answer
+                    self.chat_sessions.record(student_id, subject, question, cached)
+                parts.append(cached)
+                if speech:
+                    speech.feed(cached)
+                yield cached
             else:
-                # Text-only question
-                chat_session = self.get_chat_session(subject)
-                response = chat_session.send_message(question)
-                text_response = response.text
-
-            # Generate audio response if needed
-            audio_file = None
-            if language != "en":
-                audio_file = self.text_to_speech(text_response, language)
-
-            return {
-                "text_response": text_response,
-                "audio_file": audio_file
-            }
+                chatting = not image
+                response = self._request_answer(question, subject, image, student_id, stream=True)
+                for chunk in response:
+                    text = _chunk_text(chunk)
+                    if not text:
+                        continue
+                    if not parts:
+                        stream.first_chunk_latency = time.perf_counter() - stream.started
+                    parts.append(text)
+                    if speech:
+                        speech.feed(text)
+                    yield text
+                chatting = False
+
+                if not image:
+                    self.chat_sessions.touch(student_id, subject)
+                if parts:
+                    self.response_cache.put(key, "".join(parts), time.perf_counter() - stream.started)
+                else:
+                    # Every chunk was withheld by a safety filter; this reply is not cached
+                    message = "I'm sorry, I can't answer that question. Please try rephrasing it."
+                    parts.append(message)
+                    if speech:
+                        speech.feed(message)
+                    yield message
+        except GeneratorExit:
+            # Stopped or rerun mid-answer: a half-received reply would break the session's next message
+            if chatting:
+                self.chat_sessions.discard(student_id, subject)
+            if speech:
+                speech.cancel()
+            stream.speech = None
+            raise
         except Exception as e:
-            return {
-                "text_response": f"I apologize, but I encountered an error: {str(e)}",
-                "audio_file": None
-            }
+            if chatting:
+                self.chat_sessions.discard(student_id, subject)
+            stream.error = e
+            message = f"I apologize, but I encountered an error: {str(e)}"
+            if parts:
+                message = "\n\n" + message
+            parts.append(message)
+            if speech:
+                speech.cancel()
+            stream.speech = None
+            yield message
+            stream.text = "".join(parts)
+            return
 
-    def generate_practice_questions(self, subject, topic, difficulty="medium", question_type="Multiple Choice", num_questions=5):
-        """Generate practice questions based on subject and topic"""
-        try:
-            # Initialize chat session if not exists
-            chat_session = self.get_chat_session(subject)
-            
-            if question_type == "Multiple Choice":
-                prompt = f"""Generate {num_questions} {difficulty} level multiple-choice questions about {topic} in {subject}.
-                For each question, provide:
-                1. Clear question statement
-                2. Four options (A, B, C, D)
-                3. Correct answer
-                4. Brief explanation why the answer is correct
-                
-                Return the response in this exact JSON format:
-                [
-                    {{
-                        "question": "What is...",
-                        "options": ["A) ...", "B) ...", "C) ...", "D) ..."],
-                        "correct_answer": "A) ...",
-                        "explanation": "This is correct because..."
-                    }},
-                    ...
-                ]"""
-            else:
-                prompt = f"""Generate {num_questions} {difficulty} level open-ended questions about {topic} in {subject}.
-                For each question, provide:
-                1. Clear question statement
-                2. Key points that should be included in the answer
-                3. Sample correct answer
-                4. Evaluation criteria
-                
-                Return the response in this exact JSON format:
-                [
-                    {{
-                        "question": "What is...",
-                        "key_points": ["point1", "point2", "point3"],
-                        "sample_answer": "A detailed answer...",
-                        "evaluation_criteria": "Look for these aspects..."
-                    }},
-                    ...
-                ]"""
-            
-            # Send message using the initialized chat session
+        stream.text = "".join(parts)
+        if speech:
+            speech.close()
+
+    def _answer_key(self, question, subject, grade_level, image_file, language, student_id=None):
+        """Response cache key of a question, plus the prepared ``IngestedImage`` if one was uploaded"""
+        if image_file:
+            image = self.images.ingest(image_file)
+            return cache_key(question, subject, grade_level, language, image.hash), image
+        # Chat answers depend on the student's conversation so far
+        history = self.chat_sessions.history_digest(student_id, subject)
+        return cache_key(question, subject, grade_level, language, history_digest=history), None
+
+    def _request_answer(self, question, subject, image, student_id, stream=False):
+        """Send a question to the vision model or the student's chat session"""
+        if image:
+            # Handle image upload
+            self.limiter.acquire(CHAT, student_id)
+            return self.backend.vision(question, image.data, stream=stream, mime_type=image.mime_type)
+        # Text-only question
+        chat_session = self.get_chat_session(subject, student_id)
+        question = self.chat_sessions.prepare(student_id, subject, question,
+                                              estimate_tokens(_tutor_instruction(subject)))
+        self.limiter.acquire(CHAT, student_id)
+        response = chat_session.send_message(question, stream=stream)
+        if not stream:
+            self.chat_sessions.touch(student_id, subject)
+        return response
+
+    def cache_stats(self):
+        """Get response cache hits, misses and latency saved"""
+        return self.response_cache.stats()
+
+    def image_stats(self):
+        """Get uploads prepared and reused, bytes saved by downscaling, and OCR cache hits"""
+        return {"uploads": self.images.cache_stats(), "ocr": self.ocr.cache_stats()}
+
+    def audio_stats(self):
+        """Get spoken answer cache hits, hit rate and disk usage, and time to first audio"""
+        return {"cache": self.audio_cache.stats(), "speech": self.speech.stats(), "backends": self.tts.stats()}
+
+    def chat_stats(self):
+        """Get estimated tokens per chat request, the token cap and history compactions"""
+        return dict(self.chat_sessions.context_stats(), **self.chat_sessions.memory())
+
+    def rate_limit_stats(self):
+        """Get model call queue depth and wait times per priority"""
+        return self.limiter.stats()
+
+    def generate_practice_questions(self, subject, topic, difficulty="medium", question_type="Multiple Choice", num_questions=5, student_id=None):
+        """Serve practice questions the student has not seen from the question bank"""
+        pool = (subject, topic, difficulty, question_type)
+        questions = self.question_bank.take(pool, num_questions, student_id, refill=False)
+
+        if len(questions) < num_questions:
+            # Cold or exhausted pool: generate now instead of waiting for the background refill
             try:
-                response = chat_session.send_message(prompt)
-                
-                # Extract JSON from response
-                import json
-                import re
-
-                # Find JSON array in the response
-                json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
-                if json_match:
-                    try:
-                        questions = json.loads(json_match.group())
-                        if questions and isinstance(questions, list):
-                            return questions[:num_questions]  # Ensure we return the requested number of questions
-                    except json.JSONDecodeError:
-                        print("Failed to parse JSON from match")
-                
-                # If we get here, either no JSON array was found or parsing failed
-                return self._get_offline_questions(subject, topic, question_type, num_questions)
-                
+                generated = self._generate_questions(subject, topic, difficulty, question_type,
+                                                     max(num_questions, self.question_bank.refill_batch),
+                                                     student_id=student_id)
+                self.question_bank.add(pool, generated)
+                questions += self.question_bank.take(pool, num_questions - len(questions), student_id, refill=False)
             except Exception as e:
-                print(f"API request failed: {str(e)}")
-                return self._get_offline_questions(subject, topic, question_type, num_questions)
-            
-        except Exception as e:
-            print(f"Error generating questions: {str(e)}")
+                print(f"Error generating questions: {str(e)}")
+        self.question_bank.top_up(pool, student_id)
+
+        if not questions:
             return self._get_offline_questions(subject, topic, question_type, num_questions)
+        return questions
+
+    def _generate_questions(self, subject, topic, difficulty, question_type, num_questions,
+                            priority=GENERATION, student_id=None):
+        """Ask the model for a batch of questions; used directly and by the question bank refill worker"""
+        if question_type == "Multiple Choice":
+            prompt = f"""Generate {num_questions} {difficulty} level multiple-choice questions about {topic} in {subject}.
+            For each question, provide:
+            1. Clear question statement
+            2. Four options (A, B, C, D)
+            3. Correct answer
+            4. Brief explanation why the answer is correct
+            
+            Return the response in this exact JSON format:
+            [
+                {{
+                    "question": "What is...",
+                    "options": ["A) ...", "B) ...", "C) ...", "D) ..."],
+                    "correct_answer": "A) ...",
+                    "explanation": "This is correct because..."
+                }},
+                ...
+            ]"""
+        else:
+            prompt = f"""Generate {num_questions} {difficulty} level open-ended questions about {topic} in {subject}.
+            For each question, provide:
+            1. Clear question statement
+            2. Key points that should be included in the answer
+            3. Sample correct answer
+            4. Evaluation criteria
+            
+            Return the response in this exact JSON format:
+            [
+                {{
+                    "question": "What is...",
+                    "key_points": ["point1", "point2", "point3"],
+                    "sample_answer": "A detailed answer...",
+                    "evaluation_criteria": "Look for these aspects..."
+                }},
+                ...
+            ]"""
+        
+        self.limiter.acquire(priority, student_id)
+        response = self.backend.generate(prompt)
+
+        # Find JSON array in the response
+        json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
+        if not json_match:
+            raise ValueError("No JSON array in the model response")
+        questions = json.loads(json_match.group())
+        if not isinstance(questions, list):
+            raise ValueError("Model response is not a list of questions")
+        return questions[:num_questions]
 
     def _get_offline_questions(self, subject, topic, question_type, num_questions):
         """Get pre-defined offline questions when API is unavailable"""
@@ -292,7 +443,191 @@ class AITutorService:
             Format the response in markdown."""
             
             chat_session = self.get_chat_session(subject)
+            prompt = self.chat_sessions.prepare(None, subject, prompt, estimate_tokens(_tutor_instruction(subject)))
+            self.limiter.acquire(GRADING)
             response = chat_session.send_message(prompt)
+            self.chat_sessions.touch(None, subject)
             return response.text
         except Exception as e:
-            return f"Error evaluating answer: {str(e)}" 
\ No newline at end of file
+            return f"Error evaluating answer: {str(e)}" 
+
+    def evaluate_answers(self, submissions, subject, grade_level, student_id=None):
+        """Grade a whole open-ended submission of ``(question, answer)`` pairs
+
+        Returns one ``{"score": float or None, "feedback": markdown}`` per answer. All
+        answers are graded in a single structured request; answers the reply does not
+        cover are graded concurrently, one request each.
+        """
+        results = [None] * len(submissions)
+        pending = []
+        for i, (question, answer) in enumerate(submissions):
+            if not (answer or "").strip():
+                results[i] = {"score": 0.0, "feedback": "No answer was given."}
+            else:
+                pending.append(i)
+
+        if len(pending) > 1:
+            try:
+                graded = self._grade_batch([submissions[i] for i in pending], subject, grade_level, student_id)
+                for i, result in zip(pending, graded):
+                    results[i] = result
+            except Exception as e:
+                print(f"Batch grading failed: {str(e)}")
+            pending = [i for i in pending if results[i] is None]
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(GRADING_WORKERS, len(pending))) as pool:
+                graded = pool.map(lambda i: self._grade_one(*submissions[i], subject, grade_level, student_id), pending)
+                for i, result in zip(pending, graded):
+                    results[i] = result
+        return results
+
+    def _grade_batch(self, submissions, subject, grade_level, student_id=None):
+        """Grade several answers in one request; entries the reply does not cover are ``None``"""
+        answers = "\n\n".join(
+            f"Answer {i + 1}\nQuestion: {_question_text(question)}\nStudent's Answer: {answer}"
+            for i, (question, answer) in enumerate(submissions)
+        )
+        prompt = f"""Evaluate these answers of a grade {grade_level} student in {subject}.
+
+        {answers}
+
+        For every answer, give a score from 0 to 100 and detailed feedback in markdown
+        with suggestions for improvement and key concepts to review.
+
+        Return the response in this exact JSON format:
+        [
+            {{"answer": 1, "score": 85, "feedback": "..."}},
+            ...
+        ]"""
+        self.limiter.acquire(GRADING, student_id)
+        response = self.backend.generate(prompt)
+
+        json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
+        if not json_match:
+            raise ValueError("No JSON array in the model response")
+        results = [None] * len(submissions)
+        for entry in json.loads(json_match.group()):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("answer")) - 1
+            except (TypeError, ValueError):
+                continue
+            score = _parse_score(entry.get("score"))
+            if 0 <= index < len(results) and score is not None:
+                results[index] = {"score": score, "feedback": str(entry.get("feedback", ""))}
+        return results
+
+    def _grade_one(self, question, answer, subject, grade_level, student_id=None):
+        """Grade a single answer; failures come back with a ``None`` score"""
+        try:
+            return self._request_grade(question, answer, subject, grade_level, student_id)
+        except Exception as e:
+            return {"score": None, "feedback": f"Error evaluating answer: {str(e)}"}
+
+    def _request_grade(self, question, answer, subject, grade_level, student_id=None):
+        """Grade a single answer in one request"""
+        prompt = f"""Evaluate this grade {grade_level} student's answer in {subject}:
+
+        Question: {_question_text(question)}
+
+        Student's Answer: {answer}
+
+        Give a score from 0 to 100 and detailed feedback in markdown with suggestions
+        for improvement and key concepts to review.
+
+        Return the response in this exact JSON format:
+        {{"score": 85, "feedback": "..."}}"""
+        self.limiter.acquire(GRADING, student_id)
+        response = self.backend.generate(prompt)
+        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
+        if not json_match:
+            raise ValueError("No JSON object in the model response")
+        entry = json.loads(json_match.group())
+        return {"score": _parse_score(entry.get("score")), "feedback": str(entry.get("feedback", ""))}
+
+
+def _tutor_instruction(subject):
+    """System instruction of a subject's tutor chat"""
+    return f"""You are an expert tutor in {subject}. Your role is to:
+    1. Help students understand concepts clearly
+    2. Provide practical examples
+    3. Answer questions patiently
+    4. Give constructive feedback
+    5. Encourage learning through practice
+
+    Please maintain a friendly and supportive tone while being professional."""
+
+
+def _chunk_text(chunk):
+    """Text of a streamed response chunk; chunks stopped by a safety filter have none
+
+    ``chunk.text`` raises for such chunks, so Gemini chunks are read from their parts.
+    """
+    candidates = getattr(chunk, "candidates", None)
+    if candidates is None:
+        return getattr(chunk, "text", "") or ""
+    if not candidates:
+        return ""
+    content = getattr(candidates[0], "content", None)
+    return "".join(getattr(part, "text", "") or "" for part in getattr(content, "parts", None) or [])
+
+
+def _question_text(question):
+    """Question statement plus the grading hints generated with it"""
+    if not isinstance(question, dict):
+        return str(question)
+    text = question.get("question", "")
+    if question.get("key_points"):
+        text += "\nKey points: " + "; ".join(str(point) for point in question["key_points"])
+    if question.get("evaluation_criteria"):
+        text += "\nEvaluation criteria: " + str(question["evaluation_criteria"])
+    return text
+
+
+def _parse_score(value):
+    """Clamp a model-reported score to 0-100, or ``None`` if it is not a number"""
+    try:
+        return min(max(float(value), 0.0), 100.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TutorStream:
+    """Iterable of response text chunks; ``text`` is set once it is exhausted
+
+    ``speech`` is the answer's ``SpeechJob`` while the text streams in, and stays
+    ``None`` for English answers or once the answer failed. ``error`` is the exception
+    the answer failed with, reported to the student as text.
+    """
+
+    def __init__(self):
+        self.chunks = iter(())
+        self.text = None
+        self.speech = None
+        self.error = None
+        self.cached = False  # Served from the response cache without calling the model
+        self.started = time.perf_counter()
+        self.first_chunk_latency = None  # Seconds until the first chunk was available
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def first_audio_chunk(self):
+        """Audio file of the first spoken chunk if it is already synthesized, without waiting"""
+        return self.speech.first_chunk() if self.speech else None
+
+    def audio_chunks(self):
+        """Audio files of the spoken answer in order, each yielded as soon as it is ready"""
+        return self.speech.chunks() if self.speech else iter(())
+
+    @property
+    def audio_file(self):
+        """The whole spoken answer as one file, once every chunk is synthesized"""
+        return self.speech.audio_file() if self.speech else None
+
+    @property
+    def first_audio_latency(self):
+        """Seconds from the question until the first audio chunk was playable"""
+        return self.speech.first_audio_latency if self.speech else None
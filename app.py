@@ -1,13 +1,17 @@
+import asyncio
+import atexit
 import base64
 import os
+import time
 from datetime import datetime
 
 import streamlit as st
 import streamlit.components.v1 as components
-from PIL import Image
 
 from ai_service import AITutorService
-from config import ALLOWED_SUBJECTS, APP_NAME, SUBJECT_DISPLAY_NAMES
+from async_tutor import AsyncTutorService
+from config import ALLOWED_IMAGE_TYPES, ALLOWED_SUBJECTS, APP_NAME, LANGUAGES, SUBJECT_DISPLAY_NAMES, SUBJECT_TOPICS
+from speech import audio_seconds
 from student_manager import StudentManager
 from study_planner import StudyPlanner, generate_study_schedule
 
@@ -15,74 +19,21 @@ from study_planner import StudyPlanner, generate_study_schedule
 # Initialize services
 @st.cache_resource
 def init_services():
-    return AITutorService(), StudentManager()
-
-# Define courses dictionary
-courses = {
-    "Programming": [
-        "Python",
-        "Java",
-        "JavaScript",
-        "C++",
-        "SQL"
-    ],
-    "Web Development": [
-        "HTML/CSS",
-        "React",
-        "Node.js",
-        "MongoDB",
-        "APIs"
-    ],
-    "Mobile Development": [
-        "Android Development",
-        "iOS Development",
-        "React Native",
-        "Flutter",
-        "Mobile UI/UX"
-    ],
-    "Artificial Intelligence": [
-        "Machine Learning",
-        "Deep Learning",
-        "Neural Networks",
-        "Computer Vision",
-        "Natural Language Processing"
-    ],
-    "Software Engineering": [
-        "Software Design Patterns",
-        "Clean Code",
-        "Testing & QA",
-        "DevOps & CI/CD",
-        "Agile Methodologies"
-    ],
-    "Computer Networks": [
-        "Network Protocols",
-        "Network Security",
-        "Cloud Computing",
-        "Distributed Systems",
-        "Cybersecurity"
-    ],
-    "Database Systems": [
-        "SQL Advanced",
-        "NoSQL Databases",
-        "Database Design",
-        "Data Warehousing",
-        "Big Data"
-    ],
-    "Operating Systems": [
-        "Process Management",
-        "Memory Management",
-        "File Systems",
-        "System Security",
-        "Shell Scripting"
-    ],
-    "Computer Architecture": [
-        "Digital Logic",
-        "Computer Organization",
-        "Assembly Language",
-        "Microprocessors",
-        "Embedded Systems"
-    ]
-}
+    ai_tutor = AITutorService()
+    atexit.register(ai_tutor.close)
+    return ai_tutor, StudentManager()
+
+
+# Async front end sharing the tutor's caches, with retries and a circuit breaker
+@st.cache_resource
+def init_async_tutor():
+    return AsyncTutorService(init_services()[0])
+
+# Define courses dictionary, keyed by subject display name
+courses = {SUBJECT_DISPLAY_NAMES[subject]: SUBJECT_TOPICS[subject] for subject in ALLOWED_SUBJECTS}
+
+# Subject key for each display name
+subject_keys = {display: subject for subject, display in SUBJECT_DISPLAY_NAMES.items()}
 
 def display_sidebar_profile(student_data):
     """Display user profile in sidebar"""
@@ -122,7 +73,7 @@ def display_sidebar_profile(student_data):
             )
             if is_selected:
                 st.session_state.selected_category = category
-                st.session_state.subject = category.lower().replace(" ", "_")
+                st.session_state.subject = subject_keys[category]
                 st.session_state.current_topic = courses[category][0]  # Set first course as default
                 st.rerun()
         
@@ -159,17 +110,17 @@ def display_sidebar_profile(student_data):
         
         # Save settings
         if st.button("Save Settings"):
-            student_data["preferences"].update({
-                "language": language,
-                "theme": theme,
-                "notifications": notifications
-            })
-            
-            student_manager.update_student_data(st.session_state.student_id, student_data)
+            student_manager.update_preferences(
+                st.session_state.student_id,
+                language=language,
+                theme=theme,
+                notifications=notifications
+            )
             st.success("Settings saved!")
         
         # Logout button
         if st.button("Logout"):
+            ai_tutor.chat_sessions.discard(st.session_state.student_id)
             st.session_state.clear()
             st.rerun()
 
@@ -188,6 +139,10 @@ def display_login():
     col1, col2 = st.columns([1, 1])
 
     with col1:
+        if st.session_state.get("password_reset_id"):
+            display_password_reset(st.session_state.password_reset_id)
+            return
+
         st.subheader("Login")
         login_id = st.text_input("Student ID", key="login_id")
         password = st.text_input("Password", type="password", key="login_password")
@@ -196,37 +151,18 @@ def display_login():
                 # Get student data
                 student_data = student_manager.get_student_data(login_id)
                 
-                # Verify password
-                if student_data.get("password") == password:
-                    # Initialize login tracking if not exists
-                    if "login_tracking" not in student_data:
-                        student_data["login_tracking"] = {
-                            "last_login": None,
-                            "login_streak": 0
-                        }
-                    
-                    # Get current time
-                    current_time = datetime.now()
-                    
-                    # Update login streak
-                    if student_data["login_tracking"]["last_login"]:
-                        last_login = datetime.fromisoformat(student_data["login_tracking"]["last_login"])
-                        days_diff = (current_time.date() - last_login.date()).days
-                        
-                        if days_diff == 1:  # Consecutive day login
-                            student_data["login_tracking"]["login_streak"] += 1
-                        elif days_diff > 1:  # Streak broken
-                            student_data["login_tracking"]["login_streak"] = 1
-                        # If same day login, keep streak as is
+                if student_data.get("needs_password_reset"):
+                    # Locked accounts sign in once with the reset code their administrator handed out
+                    if student_manager.check_reset_code(login_id, password):
+                        st.session_state.password_reset_id = login_id
+                        st.rerun()
                     else:
-                        # First time login
-                        student_data["login_tracking"]["login_streak"] = 1
-                    
-                    # Update last login time
-                    student_data["login_tracking"]["last_login"] = current_time.isoformat()
-                    
-                    # Save updated data
-                    student_manager.update_student_data(login_id, student_data)
+                        st.error("This account needs a new password. Enter the one-time reset code "
+                                 "from your administrator as your password.")
+                # Verify password
+                elif student_data.get("password") == password:
+                    # Record the login and update the login streak
+                    student_manager.record_login(login_id)
                     
                     # Set session state
                     st.session_state.student_id = login_id
@@ -352,22 +288,35 @@ def display_login():
                 st.error("Please fill all fields.")
 
 
+def display_password_reset(student_id):
+    """Let a student who signed in with a valid reset code choose a password"""
+    st.subheader("Set Your Password")
+    st.info(f"Welcome back! Choose a new password for {student_id} to continue.")
+    password = st.text_input("New Password", type="password", key="reset_password")
+    confirm_password = st.text_input("Confirm Password", type="password", key="reset_confirm_password")
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        if st.button("Set Password"):
+            if password != confirm_password:
+                st.error("Passwords do not match. Please try again.")
+            elif len(password) < 6:
+                st.error("Password must be at least 6 characters long.")
+            else:
+                student_manager.set_password(student_id, password)
+                student_manager.record_login(student_id)
+                del st.session_state.password_reset_id
+                st.session_state.student_id = student_id
+                st.session_state.authenticated = True
+                st.rerun()
+    with col2:
+        if st.button("Cancel"):
+            del st.session_state.password_reset_id
+            st.rerun()
+
+
 def display_chat():
     """Display chat interface"""
-    # Convert subject name to proper format for display
-    subject_display_names = {
-        "programming": "Programming",
-        "web_dev": "Web Development",
-        "mobile_dev": "Mobile Development",
-        "ai": "Artificial Intelligence",
-        "software_eng": "Software Engineering",
-        "networks": "Computer Networks",
-        "dbms": "Database Systems",
-        "os": "Operating Systems",
-        "computer_arch": "Computer Architecture"
-    }
-    
-    display_subject = subject_display_names.get(st.session_state.subject, 
+    display_subject = SUBJECT_DISPLAY_NAMES.get(st.session_state.subject, 
                                               st.session_state.subject.replace('_', ' ').title())
     st.subheader(f"{display_subject} Tutor")
 
@@ -413,7 +362,12 @@ def display_chat():
                     st.write(msg["content"])
                     if "audio_file" in msg and msg["audio_file"]:
                         try:
-                            st.audio(msg["audio_file"])
+                            # A newly answered question keeps playing from where its first chunk got to
+                            resume = msg.pop("resume_audio", None)
+                            if resume is None:
+                                st.audio(msg["audio_file"])
+                            else:
+                                st.audio(msg["audio_file"], start_time=int(resume), autoplay=True)
                         except:
                             st.warning("Audio file not available")
 
@@ -425,7 +379,7 @@ def display_chat():
         user_input = st.chat_input("Ask your question...")
 
     with col2:
-        uploaded_file = st.file_uploader("Upload Image", type=["jpg", "jpeg", "png"])
+        uploaded_file = st.file_uploader("Upload Image", type=ALLOWED_IMAGE_TYPES)
 
     if user_input or uploaded_file:
         # Add user message to history
@@ -438,32 +392,53 @@ def display_chat():
         student_data = student_manager.get_student_data(st.session_state.student_id)
         grade_level = student_data["grade"]
         
-        # Convert UI language name to language code
-        language_mapping = {
-            "English": "en",
-            "Spanish": "es",
-            "French": "fr",
-            "German": "de",
-            "Chinese": "zh"
-        }
-        language = language_mapping.get(student_data["preferences"]["language"], "en")
-
-        # Get AI response
-        with st.spinner("Thinking..."):
-            response = ai_tutor.ask_question(
-                question=user_input,
-                subject=st.session_state.subject,
-                grade_level=grade_level,
-                image_file=uploaded_file,
-                language=language
-            )
+        # Convert UI language name to language code; the settings page stores the code itself
+        language_mapping = {name: code for code, name in LANGUAGES.items()}
+        preferred = student_data["preferences"].get("language", "English")
+        language = preferred if preferred in LANGUAGES else language_mapping.get(preferred, "en")
+
+        # Stream the AI response into the chat as it is generated, behind the circuit breaker
+        stream = async_tutor.stream_question(
+            question=user_input,
+            subject=st.session_state.subject,
+            grade_level=grade_level,
+            image_file=uploaded_file,
+            language=language,
+            student_id=st.session_state.student_id
+        )
+        with chat_container:
+            with st.chat_message("user"):
+                st.write(st.session_state.chat_history[-1]["content"])
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                audio_placeholder = st.empty()
+                partial = ""
+                first_audio = None
+                for chunk in stream:
+                    partial += chunk
+                    placeholder.markdown(partial + "▌")
+                    # The first spoken sentence starts playing while the rest of the text streams in
+                    if first_audio is None:
+                        first_audio = stream.first_audio_chunk()
+                        if first_audio:
+                            audio_placeholder.audio(first_audio, autoplay=True)
+                            audio_started = time.perf_counter()
+                placeholder.markdown(stream.text)
+                if first_audio is None:
+                    first_audio = next(stream.audio_chunks(), None)
+                    if first_audio:
+                        audio_placeholder.audio(first_audio, autoplay=True)
+                        audio_started = time.perf_counter()
+                # Later chunks are joined into one file for the history while the first one plays
+                audio_file = stream.audio_file
 
         # Add AI response to history
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": response["text_response"],
-            "audio_file": response["audio_file"]
-        })
+        response = {"role": "assistant", "content": stream.text, "audio_file": audio_file}
+        if first_audio and audio_file:
+            heard = time.perf_counter() - audio_started
+            first_length = audio_seconds(first_audio)
+            response["resume_audio"] = heard if first_length is None else min(heard, first_length)
+        st.session_state.chat_history.append(response)
 
         # Update session count
         st.session_state.questions_asked += 1
@@ -510,13 +485,14 @@ def display_practice():
         student_data = student_manager.get_student_data(st.session_state.student_id)
         with st.spinner("Generating questions..."):
             try:
-                questions = ai_tutor.generate_practice_questions(
+                questions = asyncio.run(async_tutor.generate_practice_questions(
                     subject=current_subject,
                     topic=current_course,
                     difficulty=student_data["preferences"].get("difficulty_level", "medium"),
                     question_type=question_type,
-                    num_questions=num_questions
-                )
+                    num_questions=num_questions,
+                    student_id=st.session_state.student_id
+                ))
                 st.session_state.practice_questions = questions
                 st.session_state.current_answers = []
                 st.session_state.submitted = False
@@ -591,47 +567,36 @@ def display_practice():
                 total_score = 0
                 
                 st.markdown("### Results")
-                for i, (question, answer) in enumerate(zip(st.session_state.practice_questions, st.session_state.current_answers)):
+                with st.spinner("Grading your answers..."):
+                    evaluations = asyncio.run(async_tutor.evaluate_answers(
+                        list(zip(st.session_state.practice_questions, st.session_state.current_answers)),
+                        subject=current_subject,
+                        grade_level=student_data["grade"],
+                        student_id=st.session_state.student_id
+                    ))
+                for i, evaluation in enumerate(evaluations):
                     with st.expander(f"Question {i+1} Feedback", expanded=True):
-                        evaluation = ai_tutor.evaluate_answer(
-                            question=question.get("question", ""),
-                            student_answer=answer,
-                            subject=current_subject,
-                            grade_level=student_data["grade"]
-                        )
-                        st.markdown(evaluation)
-                        
-                        # Extract score from evaluation (assuming AI returns score in the format "Score: X/100")
-                        try:
-                            score_line = [line for line in evaluation.split('\n') if 'Score' in line][0]
-                            question_score = float(score_line.split(':')[1].strip().split('/')[0])
-                            total_score += question_score
-                        except:
-                            question_score = 0
+                        if evaluation["score"] is not None:
+                            st.markdown(f"**Score: {evaluation['score']:.0f}/100**")
+                        st.markdown(evaluation["feedback"])
+                        total_score += evaluation["score"] or 0
                 
                 # Calculate and display average score
                 st.session_state.score = total_score / len(st.session_state.practice_questions)
                 st.metric("Overall Score", f"{st.session_state.score:.1f}%")
             
-            # Update student progress
-            student_data = student_manager.get_student_data(st.session_state.student_id)
-            if "progress" not in student_data:
-                student_data["progress"] = {}
-            if current_subject not in student_data["progress"]:
-                student_data["progress"][current_subject] = {}
-            
             # Update topic progress
-            topic_progress = student_data["progress"][current_subject].get(current_course, [])
-            topic_progress.append(st.session_state.score)
-            student_data["progress"][current_subject][current_course] = topic_progress
+            student_manager.record_score(
+                st.session_state.student_id,
+                current_subject,
+                current_course,
+                st.session_state.score
+            )
             
             # Update total questions and correct answers
             st.session_state.questions_asked += len(st.session_state.practice_questions)
             st.session_state.correct_answers += int((st.session_state.score / 100) * len(st.session_state.practice_questions))
             
-            # Save updated progress
-            student_manager.update_student_data(st.session_state.student_id, student_data)
-            
             # Show encouragement message
             if st.session_state.score >= 80:
                 st.balloons()
@@ -783,6 +748,8 @@ def display_progress():
             st.caption(f"{info['description']}")
             if completed_topics >= info["required"]:
                 st.success("Unlocked!")
+                if badge not in student_data.get("badges", []):
+                    student_manager.award_badge(st.session_state.student_id, badge)
             else:
                 st.info(f"{completed_topics}/{info['required']} topics")
     
@@ -1021,7 +988,7 @@ def display_courses():
     
     if selected_category:
         # Update session state with selected category
-        st.session_state.subject = selected_category.lower().replace(" ", "_")
+        st.session_state.subject = subject_keys[selected_category]
         
         # Display courses for selected category
         st.markdown(f"### Available Courses in {selected_category}")
@@ -1089,6 +1056,7 @@ st.set_page_config(
 
 # Initialize services
 ai_tutor, student_manager = init_services()
+async_tutor = init_async_tutor()
 
 # Custom CSS
 st.markdown("""
@@ -1487,33 +1455,17 @@ else:
     # Subject selection
     st.sidebar.title("Navigation")
     
-    # Convert subject names for display
-    subject_display_names = {
-        "programming": "Programming",
-        "web_dev": "Web Development",
-        "mobile_dev": "Mobile Development",
-        "ai": "Artificial Intelligence",
-        "software_eng": "Software Engineering",
-        "networks": "Computer Networks",
-        "dbms": "Database Systems",
-        "os": "Operating Systems",
-        "computer_arch": "Computer Architecture"
-    }
-    
     # Create a list of display names for the radio button
-    display_subjects = [subject_display_names.get(subject, subject.replace('_', ' ').title()) 
-                       for subject in ALLOWED_SUBJECTS]
+    display_subjects = [SUBJECT_DISPLAY_NAMES[subject] for subject in ALLOWED_SUBJECTS]
     
     selected_display = st.sidebar.radio(
         "Choose a subject",
         display_subjects,
-        index=display_subjects.index(subject_display_names.get(st.session_state.subject, 
-                                                              st.session_state.subject.replace('_', ' ').title()))
+        index=display_subjects.index(SUBJECT_DISPLAY_NAMES[st.session_state.subject])
     )
     
     # Convert display name back to internal format
-    selected_subject = next((k for k, v in subject_display_names.items() if v == selected_display), 
-                          selected_display.lower().replace(' ', '_'))
+    selected_subject = subject_keys[selected_display]
     
     if selected_subject != st.session_state.subject:
         st.session_state.subject = selected_subject
@@ -1545,30 +1497,30 @@ else:
         st.subheader("Settings")
         language = st.selectbox(
             "Language",
-            ["en", "es", "fr", "de", "zh", "hi", "ar", "ru"],
-            format_func=lambda x: {
-                "en": "English", "es": "Spanish", "fr": "French",
-                "de": "German", "zh": "Chinese", "hi": "Hindi",
-                "ar": "Arabic", "ru": "Russian"
-            }.get(x, x),
-            index=0
+            list(LANGUAGES),
+            format_func=lambda x: LANGUAGES.get(x, x),
+            index=list(LANGUAGES).index(student_data["preferences"].get("language"))
+            if student_data["preferences"].get("language") in LANGUAGES else 0
         )
-        student_data["preferences"]["language"] = language
 
         difficulty = st.select_slider(
             "Difficulty Level",
             options=["easy", "medium", "hard"],
             value=student_data["preferences"]["difficulty_level"]
         )
-        student_data["preferences"]["difficulty_level"] = difficulty
 
-        # Save preferences
-        student_manager.update_student_data(st.session_state.student_id, student_data)
+        # Save preferences; only these two settings are written, so other tabs' changes are kept
+        preferences = student_data["preferences"]
+        if preferences.get("language") != language or preferences.get("difficulty_level") != difficulty:
+            student_data["preferences"] = student_manager.update_preferences(
+                st.session_state.student_id, language=language, difficulty_level=difficulty
+            )["preferences"]
 
         st.divider()
 
         # Logout button
         if st.button("Logout"):
+            ai_tutor.chat_sessions.discard(st.session_state.student_id)
             st.session_state.student_id = None
             st.session_state.authenticated = False
             st.rerun()
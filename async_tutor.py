@@ -0,0 +1,305 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (AI_CALL_TIMEOUT, AI_MAX_CONCURRENCY, AI_MAX_RETRIES, AI_RETRY_BASE_DELAY,
+                    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+from rate_limiter import RateLimitTimeout
+
+# Upstream errors worth retrying, matched by name so google.api_core is not imported here
+TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "Aborted",
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+
+class CallQueueTimeout(Exception):
+    """A call waited for a free slot until its deadline passed without reaching the model"""
+
+
+class CircuitBreaker:
+    """Stops calls to an unhealthy upstream after repeated transient failures
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls fail
+    fast for ``reset_timeout`` seconds. Then a single trial call is let through; its
+    success closes the circuit and its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def release(self) -> None:
+        """End a call that said nothing about upstream health, leaving the state as it was"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class AsyncTutorService:
+    """Asyncio front end to ``AITutorService`` with deadlines, retries and a circuit breaker
+
+    Blocking SDK calls run in worker threads. Each call gets ``timeout`` seconds in
+    total, transient errors are retried with jittered exponential backoff, at most
+    ``max_concurrency`` calls are in flight across every session of the process, and
+    while the circuit is open requests go straight to the same offline answers the
+    blocking service uses. Streamed chat answers go through the same breaker, slots
+    and deadline, without retries.
+    """
+
+    def __init__(self, service, timeout: float = AI_CALL_TIMEOUT, retries: int = AI_MAX_RETRIES,
+                 base_delay: float = AI_RETRY_BASE_DELAY, max_concurrency: int = AI_MAX_CONCURRENCY,
+                 breaker: CircuitBreaker = None):
+        self.service = service
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker()
+        # A private pool rather than the loop's default executor: asyncio.run waits for the
+        # default executor on exit, which would hold every request up behind a timed-out call
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency * 4, thread_name_prefix="tutor-call")
+        # Each Streamlit rerun runs its own event loop, so calls are bounded where they run, in
+        # the worker threads; a timed-out call holds its slot until the SDK returns
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0, "short_circuited": 0}
+
+    async def ask_question(self, question, subject, grade_level, image_file=None, language="en", student_id=None):
+        """Ask a question and get a response, served from the response cache when possible"""
+        service = self.service
+        try:
+            key, image = await self._run(service._answer_key, question, subject, grade_level, image_file, language,
+                                         student_id)
+        except Exception as e:
+            return {"text_response": f"I apologize, but I encountered an error: {str(e)}", "audio_file": None}
+        text_response = service.response_cache.get(key)
+        if text_response is not None and not image:
+            # Recording the exchange may summarize older history, which calls the model
+            await self._run(service.chat_sessions.record, student_id, subject, question, text_response)
+        elif text_response is None:
+            started = time.perf_counter()
+            try:
+                response = await self.call(service._request_answer, question, subject, image, student_id)
+                text_response = response.text
+            except CircuitOpenError:
+                return {"text_response": "The tutor is temporarily unavailable. Please try again in a moment.",
+                        "audio_file": None}
+            except Exception as e:
+                return {"text_response": f"I apologize, but I encountered an error: {str(e)}", "audio_file": None}
+            service.response_cache.put(key, text_response, time.perf_counter() - started)
+
+        audio_file = None
+        if language != "en":
+            try:
+                audio_file = await self._run(service.speak, text_response, language)
+            except Exception as e:
+                print(f"Text to speech failed: {str(e)}")
+        return {"text_response": text_response, "audio_file": audio_file}
+
+    def stream_question(self, question, subject, grade_level, image_file=None, language="en", student_id=None):
+        """Stream an answer like ``AITutorService.stream_question``, under the circuit breaker
+
+        Chunks already shown cannot be taken back, so a streamed answer is not retried;
+        the deadline bounds its wait for a call slot and a rate limiter token.
+        """
+        stream = self.service.stream_question(question, subject, grade_level, image_file, language, student_id)
+        stream.chunks = self._guard_stream(stream, stream.chunks)
+        return stream
+
+    def _guard_stream(self, stream, chunks):
+        """Yield ``chunks`` in a call slot and report how the answer went to the circuit breaker"""
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            chunks.close()
+            stream.text = "The tutor is temporarily unavailable. Please try again in a moment."
+            yield stream.text
+            return
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self.timeout):
+            self.breaker.release()
+            chunks.close()
+            stream.text = "The tutor is busy right now. Please try again in a moment."
+            yield stream.text
+            return
+
+        self.stats["calls"] += 1
+        finished = False
+        try:
+            with self.service.limiter.deadline(deadline):
+                yield from chunks
+            finished = True
+        finally:
+            self._slots.release()
+            error = stream.error
+            if not finished or stream.cached or (error is not None and not _is_transient(error)):
+                # Stopped early, answered from the cache or failed on bad input: nothing learned upstream
+                self.breaker.release()
+            elif error is not None:
+                self.breaker.record_failure()
+                self.stats["timeouts" if isinstance(error, (asyncio.TimeoutError, TimeoutError)) else "failures"] += 1
+            else:
+                self.breaker.record_success()
+
+    async def generate_practice_questions(self, subject, topic, difficulty="medium", question_type="Multiple Choice",
+                                          num_questions=5, student_id=None):
+        """Serve practice questions the student has not seen from the question bank"""
+        bank = self.service.question_bank
+        pool = (subject, topic, difficulty, question_type)
+        questions = bank.take(pool, num_questions, student_id, refill=False)
+
+        if len(questions) < num_questions:
+            try:
+                generated = await self.call(self.service._generate_questions, subject, topic, difficulty,
+                                            question_type, max(num_questions, bank.refill_batch),
+                                            student_id=student_id)
+                bank.add(pool, generated)
+                questions += bank.take(pool, num_questions - len(questions), student_id, refill=False)
+            except Exception as e:
+                print(f"Error generating questions: {str(e)}")
+        # Background refills would only pile onto an upstream that is already failing
+        if self.breaker.state == "closed":
+            bank.top_up(pool, student_id)
+
+        if not questions:
+            return self.service._get_offline_questions(subject, topic, question_type, num_questions)
+        return questions
+
+    async def evaluate_answers(self, submissions, subject, grade_level, student_id=None):
+        """Grade a whole open-ended submission; see ``AITutorService.evaluate_answers``"""
+        results = [None] * len(submissions)
+        pending = []
+        for i, (question, answer) in enumerate(submissions):
+            if not (answer or "").strip():
+                results[i] = {"score": 0.0, "feedback": "No answer was given."}
+            else:
+                pending.append(i)
+
+        if len(pending) > 1:
+            try:
+                graded = await self.call(self.service._grade_batch, [submissions[i] for i in pending],
+                                         subject, grade_level, student_id)
+                for i, result in zip(pending, graded):
+                    results[i] = result
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                print(f"Batch grading failed: {str(e)}")
+            pending = [i for i in pending if results[i] is None]
+
+        async def grade(i):
+            try:
+                results[i] = await self.call(self.service._request_grade, *submissions[i], subject, grade_level,
+                                             student_id)
+            except CircuitOpenError:
+                results[i] = {"score": None, "feedback": "Grading is temporarily unavailable. Please try again later."}
+            except Exception as e:
+                results[i] = {"score": None, "feedback": f"Error evaluating answer: {str(e)}"}
+
+        await asyncio.gather(*(grade(i) for i in pending))
+        return results
+
+    async def call(self, fn, *args, timeout: float = None, **kwargs):
+        """Run a blocking model call under the deadline, retry, concurrency and circuit breaker policy"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError("Upstream marked unhealthy by the circuit breaker")
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+
+            self.stats["calls"] += 1
+            started = threading.Event()
+            try:
+                # A timed-out call keeps its worker thread until the SDK returns; only the wait is abandoned
+                result = await asyncio.wait_for(
+                    self._run(self._bounded, started, time.monotonic() + remaining, fn, *args, **kwargs),
+                    deadline - loop.time())
+            except Exception as e:
+                if not started.is_set() or not _is_transient(e):
+                    # A call still queued for a slot, bad input or an unparseable reply says
+                    # nothing about upstream health
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                self.stats["timeouts" if isinstance(e, asyncio.TimeoutError) else "failures"] += 1
+                # Full jitter: sleep a random time up to the exponential backoff, within the deadline
+                delay = random.uniform(0, self.base_delay * 2 ** attempt)
+                if attempt >= self.retries or loop.time() + delay >= deadline:
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _run(self, fn, *args, **kwargs) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def _bounded(self, started: threading.Event, deadline: float, fn, *args, **kwargs):
+        """Run ``fn`` in a process-wide call slot, giving up if none frees up by ``deadline``"""
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0.0)):
+            raise CallQueueTimeout("No model call slot freed up before the deadline")
+        try:
+            started.set()
+            # Rate limiter waits end at the same deadline as the caller's
+            with self.service.limiter.deadline(deadline):
+                return fn(*args, **kwargs)
+        finally:
+            self._slots.release()
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed call may succeed when retried"""
+    if isinstance(error, RateLimitTimeout):
+        return False  # Local queueing, not an upstream failure
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
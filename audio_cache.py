@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from config import AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES
+
+AUDIO_SUFFIXES = {".mp3", ".wav", ".ogg"}
+
+
+def audio_key(text: str, language: str, voice: Optional[Dict] = None) -> str:
+    """Key of synthesized speech: the exact text, its language and the voice settings"""
+    payload = json.dumps([text, language, voice or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class AudioCache:
+    """Synthesized speech files on disk, named by their ``audio_key``
+
+    Files are served straight from the cache directory and keep the format suffix
+    they were stored with. Once they take up more than
+    ``max_bytes`` the least recently played ones are deleted; a file's modification
+    time records its last use, so the order survives restarts.
+    """
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 suffix: str = ".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(self.directory, exist_ok=True)
+        self._files = OrderedDict()  # key -> (size, suffix), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._scan()
+
+    def path(self, key: str, suffix: Optional[str] = None) -> str:
+        return os.path.join(self.directory, key + (suffix or self.suffix))
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached audio for a key, or ``None``"""
+        with self._lock:
+            entry = self._files.get(key)
+            path = self.path(key, entry[1]) if entry else None
+            if path and os.path.exists(path):
+                self._files.move_to_end(key)
+                self._stats["hits"] += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+            # Another process may have evicted it
+            if entry:
+                self._bytes -= self._files.pop(key)[0]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, write: Callable[[str], None], suffix: Optional[str] = None) -> str:
+        """Store the audio ``write(path)`` produces under a key and return its cached path"""
+        suffix = suffix or self.suffix
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp_path)
+            path = self.path(key, suffix)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(path)
+        with self._lock:
+            previous = self._files.pop(key, None)
+            if previous:
+                self._bytes -= previous[0]
+                if previous[1] != suffix:
+                    _unlink(self.path(key, previous[1]))
+            self._files[key] = (size, suffix)
+            self._bytes += size
+            self._stats["stores"] += 1
+            self._evict(keep=key)
+        return path
+
+    def stats(self) -> Dict:
+        """Hits, misses, hit rate and disk usage against the quota"""
+        with self._lock:
+            stats = dict(self._stats, files=len(self._files), bytes=self._bytes, max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._files):
+                self._remove(key)
+
+    def _scan(self) -> None:
+        """Index the files already on disk, oldest use first, and enforce the quota"""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                # Left behind by a crash mid-synthesis
+                if now - entry.stat().st_mtime > 60 * 60:
+                    os.remove(entry.path)
+                continue
+            key, suffix = os.path.splitext(entry.name)
+            if suffix in AUDIO_SUFFIXES:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, key, stat.st_size, suffix))
+        with self._lock:
+            for _, key, size, suffix in sorted(entries):
+                self._files[key] = (size, suffix)
+                self._bytes += size
+            self._evict(keep=None)
+
+    def _evict(self, keep: Optional[str]) -> None:
+        """Delete least recently used files until the cache fits its quota; caller holds the lock"""
+        while self._bytes > self.max_bytes and self._files:
+            key = next(iter(self._files))
+            if key == keep:
+                if len(self._files) == 1:
+                    break
+                self._files.move_to_end(key)
+                continue
+            self._remove(key)
+            self._stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        size, suffix = self._files.pop(key)
+        self._bytes -= size
+        _unlink(self.path(key, suffix))
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
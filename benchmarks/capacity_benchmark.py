@@ -0,0 +1,129 @@
+"""Load-test the tutor service against the offline stub model
+
+    python benchmarks/capacity_benchmark.py
+    python benchmarks/capacity_benchmark.py --students 200 --actions 10 --latency 1.5 --failure-rate 0.05
+    python benchmarks/capacity_benchmark.py --latency 0 --tokens-per-second 0
+
+Every simulated student runs in its own thread, like a Streamlit session, and
+repeatedly asks a chat question, takes practice questions or submits answers for
+grading. Questions are drawn from a small shared pool so the response cache sees
+realistic repeats. With zero latency and an instant token rate the timings show the
+tutor's own overhead. Caches and the question bank live in a temporary directory.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_service import AITutorService  # noqa: E402
+from audio_cache import AudioCache  # noqa: E402
+from config import SUBJECT_TOPICS  # noqa: E402
+from llm_backends import StubBackend  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+ACTIONS = ["ask", "practice", "grade"]
+
+
+def run_student(service: AITutorService, student_id: str, actions: int, questions: int, seed: int,
+                timings, errors) -> None:
+    rng = random.Random(seed)
+    subject = rng.choice(sorted(SUBJECT_TOPICS))
+    topic = rng.choice(SUBJECT_TOPICS[subject])
+    for _ in range(actions):
+        action = rng.choices(ACTIONS, weights=[6, 2, 2])[0]
+        started = time.perf_counter()
+        try:
+            if action == "ask":
+                question = f"Explain {topic} example {rng.randrange(questions)}"
+                service.ask_question(question, subject, 8, student_id=student_id)
+            elif action == "practice":
+                service.generate_practice_questions(subject, topic, rng.choice(["easy", "medium", "hard"]),
+                                                    num_questions=5, student_id=student_id)
+            else:
+                submissions = [(f"Describe {topic} part {i}", f"My answer about {topic} {rng.random()}")
+                               for i in range(3)]
+                service.evaluate_answers(submissions, subject, 8, student_id=student_id)
+        except Exception as e:
+            errors[action].append(repr(e))
+        timings[action].append(time.perf_counter() - started)
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--actions", type=int, default=5, help="actions per student")
+    parser.add_argument("--questions", type=int, default=20, help="distinct chat questions per topic")
+    parser.add_argument("--latency", type=float, default=0.8, help="median seconds to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-per-minute", type=float, default=0, help="model calls per minute, 0 for unlimited")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stub = StubBackend(args.latency, args.latency_sigma, args.tokens_per_second, args.failure_rate, args.seed)
+    timings, errors = defaultdict(list), defaultdict(list)
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = AITutorService(backend=stub, response_cache=ResponseCache(os.path.join(tmp, "cache.db")),
+                                 question_bank_path=os.path.join(tmp, "bank.db"),
+                                 audio_cache=AudioCache(os.path.join(tmp, "audio")))
+        if args.rate_per_minute:
+            service.limiter = RateLimiter(args.rate_per_minute)
+        else:
+            service.limiter = RateLimiter(10 ** 9, burst=10 ** 9)
+
+        def student(i):
+            local_timings, local_errors = defaultdict(list), defaultdict(list)
+            run_student(service, f"student-{i}", args.actions, args.questions, args.seed + i,
+                        local_timings, local_errors)
+            with lock:
+                for action in ACTIONS:
+                    timings[action] += local_timings[action]
+                    errors[action] += local_errors[action]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.students) as pool:
+            list(pool.map(student, range(args.students)))
+        elapsed = time.perf_counter() - started
+        cache = service.cache_stats()
+        bank = dict(service.question_bank.stats)
+        service.close()
+
+    total = sum(len(values) for values in timings.values())
+    print(f"{args.students} students, {total} actions in {elapsed:.2f}s ({total / elapsed:.1f} actions/s)")
+    print(f"{'action':>10} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for action in ACTIONS:
+        values = timings[action]
+        if not values:
+            continue
+        print(f"{action:>10} {len(values):>6} {len(errors[action]):>6} {statistics.median(values) * 1000:>9.1f} "
+              f"{percentile(values, 0.95) * 1000:>9.1f} {percentile(values, 0.99) * 1000:>9.1f} "
+              f"{max(values) * 1000:>9.1f}")
+    print(f"model calls: {stub.stats['calls']} ({stub.stats['failures']} failed), tokens: {stub.stats['tokens']}, "
+          f"simulated model time: {stub.stats['simulated_seconds']:.1f}s")
+    print(f"response cache: {cache}")
+    print(f"question bank: {bank}")
+    for action in ACTIONS:
+        for error in sorted(set(errors[action]))[:3]:
+            print(f"  {action} error: {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
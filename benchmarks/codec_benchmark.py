@@ -0,0 +1,82 @@
+"""Compare record codecs on realistic student records
+
+    python benchmarks/codec_benchmark.py
+    python benchmarks/codec_benchmark.py --records 500 --repeat 5
+
+Records cover every subject and topic with full score histories, a few badges and
+the default preferences, i.e. a long-time active student. Codecs whose package is
+not installed are skipped.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codec import CODECS, decode, get_codec  # noqa: E402
+from config import PROGRESS_HISTORY_CAPACITY, SUBJECT_TOPICS  # noqa: E402
+from progress_history import ScoreHistory  # noqa: E402
+from student_manager import new_student_record  # noqa: E402
+
+
+def build_record(rng: random.Random) -> dict:
+    record = new_student_record(f"Student {rng.randrange(10 ** 6)}", rng.randint(1, 12),
+                                sorted(SUBJECT_TOPICS)[:rng.randint(2, 6)], "secret")
+    for subject, topics in SUBJECT_TOPICS.items():
+        record["progress"][subject] = {}
+        for topic in topics:
+            history = ScoreHistory()
+            for _ in range(rng.randint(1, PROGRESS_HISTORY_CAPACITY * 2)):
+                history.push(rng.uniform(0, 100))
+            record["progress"][subject][topic] = history.to_value()
+    record["badges"] = ["Quick Starter", "Half Way There"]
+    record["subject_priorities"] = {subject: rng.randint(1, 5) for subject in SUBJECT_TOPICS}
+    record["login_tracking"] = {"last_login": "2024-01-01T09:00:00", "login_streak": rng.randint(0, 30)}
+    return record
+
+
+def measure(codec, records, repeat: int) -> tuple:
+    best_encode = best_decode = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = [codec.encode(record) for record in records]
+        best_encode = min(best_encode, time.perf_counter() - start)
+        start = time.perf_counter()
+        for data in encoded:
+            decode(data)
+        best_decode = min(best_decode, time.perf_counter() - start)
+    size = sum(len(data) for data in encoded) / len(encoded)
+    return best_encode, best_decode, size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3, help="report the best of this many runs")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    records = [build_record(rng) for _ in range(args.records)]
+
+    print(f"{args.records} records, best of {args.repeat} runs")
+    print(f"{'codec':<10}{'encode ms/rec':>15}{'decode ms/rec':>15}{'bytes/rec':>12}")
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ValueError as e:
+            print(f"{name:<10}skipped: {e}")
+            continue
+        if codec.name != name:
+            print(f"{name:<10}skipped: package not installed")
+            continue
+        encode_time, decode_time, size = measure(codec, records, args.repeat)
+        print(f"{name:<10}{encode_time / len(records) * 1000:>15.3f}"
+              f"{decode_time / len(records) * 1000:>15.3f}{size:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+"""Measure cold import time of the app's modules and guard against heavy eager imports
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 300 --top 15
+
+Each module is imported in a fresh interpreter with ``-X importtime``. The run fails
+if importing it pulls in one of the deferred heavy dependencies, or if its
+cumulative import time exceeds the budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["ai_service", "student_manager", "study_planner", "async_tutor", "storage"]
+
+# Only loaded by the features that need them; importing the modules above must not pull them in
+DEFERRED = ["google.generativeai", "pytesseract", "gtts", "langdetect", "PIL", "matplotlib", "pandas",
+            "seaborn", "numpy"]
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """Return ``(module, self_us, cumulative_us)`` for everything imported by ``import module``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def check(module: str, budget_ms: float, top: int) -> List[str]:
+    times = import_times(module)
+    cumulative: Dict[str, int] = {name: total for name, _, total in times}
+    total_ms = cumulative.get(module, 0) / 1000
+    print(f"{module}: {total_ms:.1f} ms")
+    for name, _, total in sorted(times, key=lambda item: item[2], reverse=True)[1:top + 1]:
+        print(f"    {total / 1000:8.1f} ms  {name}")
+
+    problems = []
+    for name in DEFERRED:
+        if name in cumulative:
+            problems.append(f"{module} imports {name} eagerly")
+    if budget_ms and total_ms > budget_ms:
+        problems.append(f"{module} takes {total_ms:.1f} ms to import (budget {budget_ms:.0f} ms)")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--budget-ms", type=float, default=500, help="per-module import budget, 0 disables")
+    parser.add_argument("--top", type=int, default=10, help="slowest dependencies to list per module")
+    args = parser.parse_args()
+
+    problems = []
+    for module in args.modules:
+        problems += check(module, args.budget_ms, args.top)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
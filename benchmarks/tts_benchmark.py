@@ -0,0 +1,79 @@
+"""Compare text to speech backends on the same texts in every app language
+
+    python benchmarks/tts_benchmark.py
+    python benchmarks/tts_benchmark.py --backends espeak gtts --languages en es --repeat 5
+
+Each backend synthesizes a one-sentence and a paragraph-length text per language
+straight to a temporary file, bypassing the audio cache. Backends that are not
+installed are skipped, as are languages a backend has no voice for.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import LANGUAGES  # noqa: E402
+from tts_backends import BACKENDS  # noqa: E402
+
+SENTENCES = {
+    "en": "A fraction shows how many equal parts of a whole we have.",
+    "es": "Una fracción indica cuántas partes iguales de un todo tenemos.",
+    "fr": "Une fraction indique combien de parts égales d'un tout nous avons.",
+    "de": "Ein Bruch zeigt, wie viele gleiche Teile eines Ganzen wir haben.",
+    "zh": "分数表示我们拥有整体中多少个相等的部分。",
+    "hi": "भिन्न बताता है कि हमारे पास पूरे के कितने बराबर भाग हैं।",
+    "ar": "يوضح الكسر عدد الأجزاء المتساوية التي لدينا من الكل.",
+    "ru": "Дробь показывает, сколько равных частей целого у нас есть.",
+}
+
+
+def measure(backend, text: str, language: str, repeat: int, directory: str):
+    """Seconds per synthesis and the size of the audio produced"""
+    path = os.path.join(directory, f"{backend.name}-{language}{backend.suffix}")
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        backend.synthesize(text, language, path)
+        times.append(time.perf_counter() - started)
+    return times, os.path.getsize(path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS))
+    parser.add_argument("--languages", nargs="*", default=list(LANGUAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = []
+    for name in args.backends:
+        backend = BACKENDS[name]()
+        if backend.available():
+            backends.append(backend)
+        else:
+            print(f"{name}: not installed, skipped")
+
+    print(f"{'backend':>8} {'lang':>5} {'text':>9} {'chars':>6} {'p50 ms':>9} {'max ms':>9} {'KB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            for language in args.languages:
+                if not backend.supports(language):
+                    continue
+                sentence = SENTENCES.get(language, SENTENCES["en"])
+                for label, text in (("sentence", sentence), ("paragraph", " ".join([sentence] * 6))):
+                    try:
+                        times, size = measure(backend, text, language, args.repeat, directory)
+                    except Exception as e:
+                        print(f"{backend.name:>8} {language:>5} {label:>9}  failed: {str(e)}")
+                        continue
+                    print(f"{backend.name:>8} {language:>5} {label:>9} {len(text):>6} "
+                          f"{statistics.median(times) * 1000:>9.1f} {max(times) * 1000:>9.1f} {size / 1024:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
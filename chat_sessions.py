@@ -0,0 +1,293 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+from config import (CHAT_COMPACT_TOKENS, CHAT_KEEP_TURNS, CHAT_MAX_CONTEXT_TOKENS, CHAT_MEMORY_BUDGET,
+                    CHAT_SESSION_IDLE_TTL, CHAT_SESSION_LIMIT, CHAT_SUMMARY_MAX_TOKENS, MAX_CHAT_HISTORY)
+
+SUMMARY_PREFIX = "Summary of our conversation so far:\n"
+SUMMARY_ACK = "Thanks, I'll keep that in mind."
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count of a text, about four characters per token"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+class ChatSessionPool:
+    """Chat sessions keyed by ``(student_id, subject)`` with compacted history and bounded memory
+
+    Sessions idle for longer than ``idle_ttl`` seconds are dropped first, then least
+    recently used ones while the pool holds more than ``max_sessions`` sessions or
+    more than ``memory_budget`` bytes of message text.
+
+    Once a history grows past ``compact_tokens`` tokens or ``max_history`` messages,
+    everything but the last ``keep_turns`` exchanges is folded into a rolling summary
+    by ``summarize(previous_summary, messages)``, which sits at the start of the
+    history as one exchange. Before each message, ``prepare`` makes sure the request
+    stays within ``max_context_tokens``, compacting further if it has to.
+    """
+
+    def __init__(self, factory: Callable[[str], object], summarize: Optional[Callable[[str, List], str]] = None,
+                 max_sessions: int = CHAT_SESSION_LIMIT, idle_ttl: float = CHAT_SESSION_IDLE_TTL,
+                 memory_budget: int = CHAT_MEMORY_BUDGET, max_history: int = MAX_CHAT_HISTORY,
+                 keep_turns: int = CHAT_KEEP_TURNS, compact_tokens: int = CHAT_COMPACT_TOKENS,
+                 max_context_tokens: int = CHAT_MAX_CONTEXT_TOKENS, summary_tokens: int = CHAT_SUMMARY_MAX_TOKENS):
+        self.factory = factory
+        self.summarize = summarize or extractive_summary
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.max_history = max_history
+        self.keep_turns = keep_turns
+        self.compact_tokens = compact_tokens
+        self.max_context_tokens = max_context_tokens
+        self.summary_tokens = summary_tokens
+        self._sessions = OrderedDict()  # (student_id, subject) -> [session, last_used, size]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "created": 0, "reused": 0, "evicted_idle": 0, "evicted_lru": 0,
+            "compactions": 0, "summarized_messages": 0, "summary_failures": 0,
+            "requests": 0, "request_tokens": 0, "max_request_tokens": 0, "capped_requests": 0,
+        }
+
+    def get(self, student_id: Optional[str], subject: str):
+        """Return the student's session for a subject, creating it on first use"""
+        key = (student_id, subject)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry is not None:
+                entry[1] = now
+                self._sessions.move_to_end(key)
+                self.stats["reused"] += 1
+                return entry[0]
+
+        # Creating a session may call the model, so it happens outside the lock
+        session = self.factory(subject)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                return entry[0]  # Another request of the same student won the race
+            size = _history_size(session)
+            self._sessions[key] = [session, now, size]
+            self._bytes += size
+            self.stats["created"] += 1
+            self._evict_lru(keep=key)
+        return session
+
+    def prepare(self, student_id: Optional[str], subject: str, message: str, reserved_tokens: int = 0) -> str:
+        """Fit the next request within the token cap and return the message to send
+
+        ``reserved_tokens`` counts what goes out besides history and message, such as
+        the system instruction. Older exchanges are summarized until the request fits;
+        a message that cannot fit even on its own is cut short.
+        """
+        key = (student_id, subject)
+        history_tokens = self._history_tokens(key)
+        total = reserved_tokens + history_tokens + estimate_tokens(message)
+        # Fold the older exchanges, then all of them, then keep halving the summary
+        for keep_turns in (self.keep_turns, 0, 0, 0):
+            if total <= self.max_context_tokens:
+                break
+            self._compact(key, keep_turns, force=True)
+            history_tokens = self._history_tokens(key)
+            total = reserved_tokens + history_tokens + estimate_tokens(message)
+
+        capped = total > self.max_context_tokens
+        if capped:
+            budget = max(self.max_context_tokens - reserved_tokens - history_tokens, 0)
+            message = message[:budget * 4]
+            total = reserved_tokens + history_tokens + estimate_tokens(message)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["request_tokens"] += total
+            self.stats["max_request_tokens"] = max(self.stats["max_request_tokens"], total)
+            self.stats["capped_requests"] += capped
+        return message
+
+    def touch(self, student_id: Optional[str], subject: str) -> None:
+        """Account for a session's new size after an exchange, compacting it once it grows long"""
+        key = (student_id, subject)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return
+            self._resize(key, entry)
+            history = _history(entry[0])
+            due = len(history) > self.max_history or _tokens(history) > self.compact_tokens
+        if due:
+            self._compact(key, self.keep_turns)
+
+    def history_digest(self, student_id: Optional[str], subject: str) -> str:
+        """Digest of a session's history, or an empty string before its first exchange"""
+        with self._lock:
+            entry = self._sessions.get((student_id, subject))
+            history = _history(entry[0]) if entry is not None else []
+        if not history:
+            return ""
+        return hashlib.blake2b(transcript(history).encode("utf-8"), digest_size=16).hexdigest()
+
+    def record(self, student_id: Optional[str], subject: str, message: str, reply: str) -> None:
+        """Add an exchange answered without the model, such as a cached answer, to the session"""
+        session = self.get(student_id, subject)
+        with self._lock:
+            session.history = _history(session) + [{"role": "user", "parts": [message]},
+                                                   {"role": "model", "parts": [reply]}]
+        self.touch(student_id, subject)
+
+    def discard(self, student_id: Optional[str], subject: Optional[str] = None) -> None:
+        """Drop one session of a student, or all of them when no subject is given"""
+        with self._lock:
+            for key in [key for key in self._sessions if key[0] == student_id and subject in (None, key[1])]:
+                self._bytes -= self._sessions.pop(key)[2]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def memory(self) -> Dict[str, int]:
+        """Session count and estimated bytes of history held"""
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self._bytes, "budget": self.memory_budget}
+
+    def context_stats(self) -> Dict:
+        """Estimated tokens per request against the cap, and how often history was compacted"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["avg_request_tokens"] = stats["request_tokens"] / stats["requests"] if stats["requests"] else 0.0
+        stats["max_context_tokens"] = self.max_context_tokens
+        return stats
+
+    def _compact(self, key: Hashable, keep_turns: int, force: bool = False) -> None:
+        """Fold all but the last ``keep_turns`` exchanges of a session into its summary"""
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return
+            session = entry[0]
+            history = _history(session)
+            summary, turns = _split_summary(history)
+            start = max(len(turns) - keep_turns * 2, 0)
+            while 0 < start < len(turns) and _role(turns[start]) != "user":
+                start += 1
+            if start == 0 and not (force and summary):
+                return
+            folded = turns[:start]
+
+        # Summarizing calls the model, so it happens outside the lock
+        try:
+            summary = self.summarize(summary, folded) if folded else summary
+        except Exception as e:
+            print(f"Chat summary failed, keeping an extract instead: {str(e)}")
+            with self._lock:
+                self.stats["summary_failures"] += 1
+            summary = extractive_summary(summary, folded)
+        # Shrink the summary when there is nothing left to fold, so a forced pass still makes room
+        limit = self.summary_tokens if folded else estimate_tokens(summary) // 2
+        summary = _clip(summary, limit)
+
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or entry[0] is not session:
+                return
+            # Messages that arrived while summarizing stay at the end
+            current = _history(session)
+            session.history = _summary_messages(summary) + turns[start:] + current[len(history):]
+            self.stats["compactions"] += 1
+            self.stats["summarized_messages"] += len(folded)
+            self._resize(key, entry)
+
+    def _history_tokens(self, key: Hashable) -> int:
+        with self._lock:
+            entry = self._sessions.get(key)
+            return _tokens(_history(entry[0])) if entry is not None else 0
+
+    def _resize(self, key: Hashable, entry: list) -> None:
+        """Re-measure a session after its history changed; caller holds the lock"""
+        size = _history_size(entry[0])
+        self._bytes += size - entry[2]
+        entry[1] = time.monotonic()
+        entry[2] = size
+        self._sessions.move_to_end(key)
+        self._evict_lru(keep=key)
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop sessions unused for longer than the idle timeout; caller holds the lock"""
+        while self._sessions:
+            key, entry = next(iter(self._sessions.items()))
+            if now - entry[1] <= self.idle_ttl:
+                break
+            self._bytes -= self._sessions.pop(key)[2]
+            self.stats["evicted_idle"] += 1
+
+    def _evict_lru(self, keep: Hashable) -> None:
+        """Drop least recently used sessions until the pool fits its limits; caller holds the lock"""
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._bytes > self.memory_budget):
+            key = next(iter(self._sessions))
+            if key == keep:
+                self._sessions.move_to_end(key)
+                key = next(iter(self._sessions))
+            self._bytes -= self._sessions.pop(key)[2]
+            self.stats["evicted_lru"] += 1
+
+
+def extractive_summary(summary: str, messages: List) -> str:
+    """Summary without a model call: the earlier summary plus what the student asked"""
+    lines = [summary] if summary else []
+    for message in messages:
+        if _role(message) == "user":
+            text = " ".join(_text(message).split())
+            lines.append(f"- Student asked: {text[:200]}")
+    return "\n".join(lines)
+
+
+def transcript(messages: List) -> str:
+    """Chat messages as ``Role: text`` lines"""
+    return "\n".join(f"{_role(message).capitalize()}: {_text(message)}" for message in messages)
+
+
+def _history(session) -> List:
+    return list(getattr(session, "history", None) or [])
+
+
+def _split_summary(history: List):
+    """Split a history into its rolling summary text and the verbatim exchanges after it"""
+    if history and _role(history[0]) == "user" and _text(history[0]).startswith(SUMMARY_PREFIX):
+        return _text(history[0])[len(SUMMARY_PREFIX):], history[2:]
+    return "", history
+
+
+def _summary_messages(summary: str) -> List[Dict]:
+    if not summary:
+        return []
+    return [{"role": "user", "parts": [SUMMARY_PREFIX + summary]}, {"role": "model", "parts": [SUMMARY_ACK]}]
+
+
+def _clip(text: str, tokens: int) -> str:
+    return text if estimate_tokens(text) <= tokens else text[:tokens * 4].rsplit(" ", 1)[0]
+
+
+def _role(message) -> str:
+    return message.get("role", "") if isinstance(message, dict) else getattr(message, "role", "")
+
+
+def _text(message) -> str:
+    parts = message.get("parts", []) if isinstance(message, dict) else getattr(message, "parts", [])
+    texts = []
+    for part in parts:
+        text = part if isinstance(part, str) else (part.get("text") if isinstance(part, dict) else getattr(part, "text", ""))
+        texts.append(text or "")
+    return "".join(texts)
+
+
+def _tokens(history: List) -> int:
+    return sum(estimate_tokens(_text(message)) for message in history)
+
+
+def _history_size(session) -> int:
+    """Estimate the bytes of text held in a session's history"""
+    return sum(len(_text(message)) for message in _history(session))
@@ -0,0 +1,107 @@
+import json
+from typing import Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # Optional: only needed when records are stored as msgpack
+    msgpack = None
+
+from config import RECORD_CODEC
+
+
+class Codec:
+    """Encodes student records to bytes; ``decode`` reads whatever format the bytes are in"""
+
+    name = ""
+    magic = b""  # Header identifying the format; empty for formats that are plain JSON
+    binary = False  # Whether the output is readable as UTF-8 text
+
+    def encode(self, value) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: Union[bytes, str]):
+        return decode(data)
+
+
+class JSONCodec(Codec):
+    """Indented standard-library JSON, easy to read and diff while debugging"""
+
+    name = "json"
+
+    def __init__(self, indent: Optional[int] = 4):
+        self.indent = indent
+
+    def encode(self, value) -> bytes:
+        return json.dumps(value, indent=self.indent).encode("utf-8")
+
+
+class OrjsonCodec(Codec):
+    """Compact JSON through orjson; the output is still plain JSON"""
+
+    name = "orjson"
+
+    def encode(self, value) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MsgpackCodec(Codec):
+    """Binary msgpack behind a magic header
+
+    0xc1 is the one byte msgpack never emits, and no JSON document starts with it.
+    """
+
+    name = "msgpack"
+    magic = b"\xc1SSM"
+    binary = True
+
+    def encode(self, value) -> bytes:
+        return self.magic + msgpack.packb(value, use_bin_type=True)
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, MsgpackCodec)}
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Return the named codec (default ``RECORD_CODEC``); orjson falls back to json when not installed"""
+    name = name or RECORD_CODEC
+    if name not in CODECS:
+        raise ValueError(f"Unknown record codec: {name}")
+    if name == "orjson" and orjson is None:
+        return JSONCodec()
+    if name == "msgpack" and msgpack is None:
+        raise ValueError("The msgpack codec needs the msgpack package (pip install msgpack)")
+    return CODECS[name]()
+
+
+def decode(data: Union[bytes, str]):
+    """Decode bytes written by any codec, detecting the format from its magic header"""
+    if isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MsgpackCodec.magic)]) == MsgpackCodec.magic:
+        if msgpack is None:
+            raise ValueError("Record is stored as msgpack but the msgpack package is not installed")
+        return msgpack.unpackb(bytes(data[len(MsgpackCodec.magic):]), raw=False)
+    return loads(data)
+
+
+def loads(data: Union[bytes, str]):
+    """Parse JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Dict) -> bytes:
+    """Serialize to compact single-line JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def canonical(value) -> bytes:
+    """Serialize deterministically (sorted keys) for hashing"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from progress_history import ScoreHistory
+from storage import StorageBackend, open_backend
+
+# Upper bounds of the login streak buckets; the last bucket is open-ended
+STREAK_BUCKETS = (0, 1, 3, 7, 14, 30)
+SCORE_BINS = 10  # Score histograms use ten 10-point bins, 90-100 included in the last
+
+
+class CohortStats:
+    """Mergeable aggregates over student records with a size independent of the cohort"""
+
+    def __init__(self, active_since: str):
+        self.active_since = active_since
+        self.students = 0
+        self.active_students = 0
+        self.score_histograms: Dict[str, List[int]] = {}
+        self.score_totals: Dict[str, List[float]] = {}  # subject -> [count, sum]
+        self.streak_histogram = [0] * (len(STREAK_BUCKETS) + 1)
+        self.errors = 0
+
+    def add(self, record: Dict) -> None:
+        """Fold one student record into the aggregates"""
+        self.students += 1
+        if (record.get("last_active") or "") >= self.active_since:
+            self.active_students += 1
+
+        for subject, topics in (record.get("progress") or {}).items():
+            if not isinstance(topics, dict):
+                continue
+            histogram = self.score_histograms.setdefault(subject, [0] * SCORE_BINS)
+            totals = self.score_totals.setdefault(subject, [0, 0.0])
+            for scores in topics.values():
+                history = ScoreHistory.from_value(scores)
+                # The distribution covers the retained window; averages cover every attempt
+                for score in history.recent():
+                    histogram[min(max(int(score // 10), 0), SCORE_BINS - 1)] += 1
+                totals[0] += history.count
+                totals[1] += history.total
+
+        streak = (record.get("login_tracking") or {}).get("login_streak") or 0
+        bucket = next((i for i, bound in enumerate(STREAK_BUCKETS) if streak <= bound), len(STREAK_BUCKETS))
+        self.streak_histogram[bucket] += 1
+
+    def merge(self, other: "CohortStats") -> None:
+        """Add the aggregates of another partition into this one"""
+        self.students += other.students
+        self.active_students += other.active_students
+        self.errors += other.errors
+        for subject, histogram in other.score_histograms.items():
+            mine = self.score_histograms.setdefault(subject, [0] * SCORE_BINS)
+            for i, count in enumerate(histogram):
+                mine[i] += count
+        for subject, (count, total) in other.score_totals.items():
+            mine = self.score_totals.setdefault(subject, [0, 0.0])
+            mine[0] += count
+            mine[1] += total
+        for i, count in enumerate(other.streak_histogram):
+            self.streak_histogram[i] += count
+
+    def as_dict(self) -> Dict:
+        """Report the aggregates with readable bucket labels"""
+        bin_labels = [f"{i * 10}-{i * 10 + 9}" for i in range(SCORE_BINS - 1)] + [f"{(SCORE_BINS - 1) * 10}-100"]
+        streak_labels = []
+        lower = 0
+        for bound in STREAK_BUCKETS:
+            streak_labels.append(str(bound) if lower == bound else f"{lower}-{bound}")
+            lower = bound + 1
+        streak_labels.append(f"{lower}+")
+
+        return {
+            "students": self.students,
+            "active_students": self.active_students,
+            "active_since": self.active_since,
+            "errors": self.errors,
+            "score_distribution": {
+                subject: dict(zip(bin_labels, histogram))
+                for subject, histogram in self.score_histograms.items()
+            },
+            "average_score": {
+                subject: (total / count if count else 0.0)
+                for subject, (count, total) in self.score_totals.items()
+            },
+            "streak_histogram": dict(zip(streak_labels, self.streak_histogram)),
+        }
+
+
+def iter_records(backend: StorageBackend, student_ids: Optional[Iterable[str]] = None) -> Iterator[tuple]:
+    """Lazily yield ``(student_id, record)`` pairs, skipping records that vanish mid-scan"""
+    for student_id in (backend.ids() if student_ids is None else student_ids):
+        try:
+            yield student_id, backend.load(student_id)
+        except (FileNotFoundError, KeyError):
+            continue
+
+
+def aggregate(backend: StorageBackend, active_days: int = 7, workers: Optional[int] = None,
+              chunk_size: int = 500) -> Dict:
+    """Aggregate all student records, fanning chunks of IDs out to a process pool
+
+    Only ``2 * workers`` chunks of IDs are in flight at a time and each worker returns
+    fixed-size partial aggregates, so peak memory does not grow with the cohort.
+    ``workers=0`` scans in the calling process.
+    """
+    active_since = (datetime.now() - timedelta(days=active_days)).isoformat()
+    totals = CohortStats(active_since)
+    chunks = _chunks(backend.ids(), chunk_size)
+
+    if workers == 0:
+        for chunk in chunks:
+            totals.merge(_aggregate_records(backend, chunk, active_since))
+        return totals.as_dict()
+
+    workers = workers or os.cpu_count() or 1
+    # Spawned rather than forked: the app server's other threads may hold locks a fork would copy
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        max_in_flight = 2 * workers
+        in_flight = set()
+        for chunk in chunks:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    totals.merge(future.result())
+            in_flight.add(pool.submit(_aggregate_chunk, backend.name, backend.location, chunk, active_since))
+        for future in in_flight:
+            totals.merge(future.result())
+    return totals.as_dict()
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_worker_backends = {}
+
+
+def _aggregate_chunk(backend_name: str, location: str, student_ids: List[str], active_since: str) -> CohortStats:
+    """Worker entry point: aggregate one chunk of students"""
+    key = (backend_name, location)
+    backend = _worker_backends.get(key)
+    if backend is None:
+        backend = _worker_backends[key] = open_backend(backend_name, location)
+    return _aggregate_records(backend, student_ids, active_since)
+
+
+def _aggregate_records(backend: StorageBackend, student_ids: List[str], active_since: str) -> CohortStats:
+    stats = CohortStats(active_since)
+    for student_id in student_ids:
+        try:
+            stats.add(backend.load(student_id))
+        except (FileNotFoundError, KeyError):
+            continue
+        except ValueError:
+            stats.errors += 1
+    return stats
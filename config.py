@@ -15,6 +15,14 @@ DATA_DIR = "data"
 # Create data directory if it doesn't exist
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Storage Settings
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')  # "json", or "sqlite" after running importer.py
+SQLITE_PATH = os.path.join(DATA_DIR, "students.db")
+JOURNAL_COMPACT_EVENTS = 100  # Journal lines before a JSON record is compacted into its snapshot
+JOURNAL_FSYNC = True  # fsync every journal append so acknowledged events survive a crash
+READ_CACHE_SIZE = 256  # Student records kept parsed in memory by StudentManager (0 disables)
+RECORD_CODEC = os.getenv('RECORD_CODEC', 'orjson')  # "json" (indented, for debugging), "orjson" or "msgpack"
+
 # Allowed subjects
 ALLOWED_SUBJECTS = [
     "programming",
@@ -41,14 +49,119 @@ SUBJECT_DISPLAY_NAMES = {
     "architecture": "Computer Architecture"
 }
 
+# Topics taught in each subject, keyed like ALLOWED_SUBJECTS
+SUBJECT_TOPICS = {
+    "programming": ["Python", "Java", "JavaScript", "C++", "SQL"],
+    "web_dev": ["HTML/CSS", "React", "Node.js", "MongoDB", "APIs"],
+    "mobile_dev": ["Android Development", "iOS Development", "React Native", "Flutter", "Mobile UI/UX"],
+    "ai": ["Machine Learning", "Deep Learning", "Neural Networks", "Computer Vision", "Natural Language Processing"],
+    "software_eng": ["Software Design Patterns", "Clean Code", "Testing & QA", "DevOps & CI/CD", "Agile Methodologies"],
+    "networks": ["Network Protocols", "Network Security", "Cloud Computing", "Distributed Systems", "Cybersecurity"],
+    "databases": ["SQL Advanced", "NoSQL Databases", "Database Design", "Data Warehousing", "Big Data"],
+    "os": ["Process Management", "Memory Management", "File Systems", "System Security", "Shell Scripting"],
+    "architecture": ["Digital Logic", "Computer Organization", "Assembly Language", "Microprocessors", "Embedded Systems"]
+}
+
+# Other spellings of subject keys that older screens and records use
+SUBJECT_ALIASES = {
+    "web_development": "web_dev",
+    "mobile_development": "mobile_dev",
+    "artificial_intelligence": "ai",
+    "software_engineering": "software_eng",
+    "computer_networks": "networks",
+    "dbms": "databases",
+    "database_systems": "databases",
+    "operating_systems": "os",
+    "computer_arch": "architecture",
+    "computer_architecture": "architecture"
+}
+
 # Application Settings
 DEFAULT_LANGUAGE = "en"
+LANGUAGES = {
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "zh": "Chinese",
+    "hi": "Hindi",
+    "ar": "Arabic",
+    "ru": "Russian"
+}
 DEFAULT_DIFFICULTY = "medium"
 
 # File Upload Settings
 ALLOWED_IMAGE_TYPES = ["jpg", "jpeg", "png"]
 MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB
+IMAGE_MAX_DIMENSION = 1536  # Longest side in pixels of images sent to the vision model
+IMAGE_JPEG_QUALITY = 85  # Quality of re-encoded photos
+IMAGE_CACHE_ENTRIES = 64  # Recent uploads whose prepared image is kept in memory
+
+# OCR Settings
+OCR_LANGUAGE = 'eng'  # Tesseract language pack(s), e.g. 'eng+spa'
+OCR_TESSERACT_CONFIG = '--oem 1 --psm 3'  # LSTM engine, automatic page segmentation
+OCR_MAX_DIMENSION = 2500  # Longest side in pixels of pages given to Tesseract
+OCR_MAX_SKEW = 10  # Degrees of page rotation corrected by deskewing, 0 disables it
+OCR_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # Processes reading the pages of a batch
+OCR_CACHE_ENTRIES = 256  # OCR results kept, keyed by image hash
+
+# Progress Settings
+PROGRESS_HISTORY_CAPACITY = 32  # Most recent scores kept per topic
+PROGRESS_EWMA_ALPHA = 0.3  # Weight of the newest score in the moving average
+
+MASTERY_THRESHOLD = 0.7  # Topics below this average mastery are recommended for review
 
 # Session Settings
 MAX_CHAT_HISTORY = 50
-MAX_PRACTICE_QUESTIONS = 10 
\ No newline at end of file
+MAX_PRACTICE_QUESTIONS = 10
+GRADING_WORKERS = 4  # Concurrent requests when open-ended answers are graded one by one
+CHAT_SESSION_LIMIT = 500  # Tutor chat sessions kept open across all students
+CHAT_SESSION_IDLE_TTL = 30 * 60  # Seconds before an unused chat session is dropped
+CHAT_MEMORY_BUDGET = 64 * 1024 * 1024  # 64MB of chat history text across all sessions
+CHAT_KEEP_TURNS = 6  # Most recent exchanges kept verbatim when older ones are summarized
+CHAT_COMPACT_TOKENS = 3000  # History size in tokens that triggers summarizing older exchanges
+CHAT_SUMMARY_MAX_TOKENS = 400  # Longest rolling summary of a chat
+CHAT_MAX_CONTEXT_TOKENS = 6000  # Cap on system instruction, history and message sent per chat request
+
+# Model Call Settings
+AI_CALL_TIMEOUT = 30  # Seconds a model call may take, retries included
+AI_MAX_RETRIES = 3  # Retries of transient upstream errors
+AI_RETRY_BASE_DELAY = 0.5  # Seconds; backoff doubles per retry and is jittered
+AI_MAX_CONCURRENCY = 8  # Model calls in flight across all sessions
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive transient failures before calls go straight to the offline path
+CIRCUIT_RESET_TIMEOUT = 30  # Seconds before a trial call is let through again
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '60'))  # Shared by every student on the key
+GEMINI_BURST = 10  # Calls allowed back to back before the per-minute rate applies
+RATE_LIMIT_MAX_WAIT = 60  # Seconds a call may queue for a slot before giving up
+
+# LLM Backend Settings
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')  # 'gemini', or 'stub' for an offline simulated model
+GEMINI_MODEL = 'gemini-1.5-pro'
+GEMINI_VISION_MODEL = 'gemini-1.5-pro-vision'
+STUB_LATENCY = float(os.getenv('STUB_LATENCY', '0.8'))  # Median seconds to first token
+STUB_LATENCY_SIGMA = float(os.getenv('STUB_LATENCY_SIGMA', '0.5'))  # Lognormal spread of the latency, 0 for fixed
+STUB_TOKENS_PER_SECOND = float(os.getenv('STUB_TOKENS_PER_SECOND', '50'))  # Generation speed, 0 for instant
+STUB_FAILURE_RATE = float(os.getenv('STUB_FAILURE_RATE', '0'))  # Fraction of calls that fail as if the service were down
+STUB_SEED = int(os.getenv('STUB_SEED', '0'))
+
+# Response Cache Settings
+RESPONSE_CACHE_PATH = os.path.join(DATA_DIR, "response_cache.db")
+RESPONSE_CACHE_TTL = 7 * 24 * 60 * 60  # Seconds before a cached tutor answer is regenerated
+RESPONSE_CACHE_MEMORY_ENTRIES = 512  # Answers kept in the in-memory tier
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 50MB of answer text in the on-disk tier
+
+# Voice Response Settings
+TTS_BACKENDS = os.getenv('TTS_BACKENDS', 'espeak,gtts').split(',')  # Preference order; unavailable ones are skipped
+TTS_LANGUAGE_BACKENDS = {}  # Per-language preference order overriding TTS_BACKENDS, e.g. {"zh": ["gtts", "espeak"]}
+TTS_SLOW = False  # Slower, more deliberate speech (gTTS)
+TTS_TLD = 'com'  # Google Translate domain, which picks the accent (gTTS)
+ESPEAK_SPEED = 165  # Words per minute (espeak-ng)
+AUDIO_CACHE_DIR = os.path.join(DATA_DIR, "audio_cache")
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200MB of synthesized speech kept on disk
+TTS_WORKERS = 4  # Answer chunks synthesized concurrently
+TTS_CHUNK_CHARS = 300  # Characters of whole sentences per synthesized chunk after the first sentence
+
+# Question Bank Settings
+QUESTION_BANK_PATH = os.path.join(DATA_DIR, "question_bank.db")
+QUESTION_BANK_LOW_WATERMARK = 10  # Unseen questions per pool below which a background refill starts
+QUESTION_BANK_REFILL_BATCH = 10  # Questions generated per refill
@@ -0,0 +1,173 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Union
+
+from config import (ALLOWED_IMAGE_TYPES, IMAGE_CACHE_ENTRIES, IMAGE_JPEG_QUALITY, IMAGE_MAX_DIMENSION,
+                    MAX_UPLOAD_SIZE)
+
+# Leading bytes of each accepted format, so the file name or browser MIME type is not trusted
+SIGNATURES = {
+    "jpeg": [b"\xff\xd8\xff"],
+    "png": [b"\x89PNG\r\n\x1a\n"],
+    "gif": [b"GIF87a", b"GIF89a"],
+    "webp": [b"RIFF"],
+}
+FORMAT_ALIASES = {"jpg": "jpeg"}
+MIME_TYPES = {"jpeg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+READ_CHUNK = 64 * 1024
+
+
+class ImageRejected(ValueError):
+    """An upload that is too large, not an image, or of a type that is not allowed"""
+
+
+class IngestedImage:
+    """An upload ready for the vision model: possibly downscaled bytes, their MIME type and hash"""
+
+    __slots__ = ("data", "mime_type", "width", "height", "original_size", "hash")
+
+    def __init__(self, data: bytes, mime_type: str, width: int, height: int, original_size: int, hash: str):
+        self.data = data
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+        self.original_size = original_size
+        self.hash = hash  # Of the decoded, oriented and downscaled pixels, shared by lossless re-saves only
+
+
+class ImageIngestor:
+    """Validates, downscales and re-encodes uploaded images before they reach the model
+
+    Uploads are read in chunks and rejected as soon as they pass ``max_bytes``, and
+    their type is checked from the file signature against ``allowed_types``. Images
+    larger than ``max_dimension`` pixels on a side are downscaled; photos are
+    re-encoded as JPEG and images with transparency as PNG, unless the original file
+    is already smaller. Results of the last ``cache_entries`` distinct uploads are kept,
+    so the same file sent again is not processed twice.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UPLOAD_SIZE, allowed_types: List[str] = ALLOWED_IMAGE_TYPES,
+                 max_dimension: int = IMAGE_MAX_DIMENSION, jpeg_quality: int = IMAGE_JPEG_QUALITY,
+                 cache_entries: int = IMAGE_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.allowed_formats = {FORMAT_ALIASES.get(t.lower(), t.lower()) for t in allowed_types}
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()  # hash of the upload -> IngestedImage
+        self._lock = threading.Lock()
+        self.stats = {"ingested": 0, "reused": 0, "rejected": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def ingest(self, upload: Union[bytes, str, BinaryIO]) -> IngestedImage:
+        """Validate and prepare an upload given as bytes, a path or a file object"""
+        try:
+            data = self.read(upload)
+            image_format = self.sniff(data)
+        except ImageRejected:
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise
+
+        upload_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            image = self._cache.get(upload_hash)
+            if image is not None:
+                self._cache.move_to_end(upload_hash)
+                self.stats["reused"] += 1
+                return image
+
+        try:
+            image = self._prepare(data, image_format)
+        except ImageRejected:
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise
+        with self._lock:
+            self._cache[upload_hash] = image
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+            self.stats["ingested"] += 1
+            self.stats["bytes_in"] += len(data)
+            self.stats["bytes_out"] += len(image.data)
+        return image
+
+    def read(self, upload: Union[bytes, str, BinaryIO]) -> bytes:
+        """Read an upload, stopping as soon as it is larger than allowed"""
+        if isinstance(upload, (bytes, bytearray)):
+            if len(upload) > self.max_bytes:
+                raise ImageRejected(f"Image is larger than {self.max_bytes // (1024 * 1024)}MB")
+            return bytes(upload)
+        if isinstance(upload, str):
+            with open(upload, "rb") as f:
+                return self.read(f)
+
+        if hasattr(upload, "seek"):
+            upload.seek(0)
+        buffer = io.BytesIO()
+        while True:
+            chunk = upload.read(READ_CHUNK)
+            if not chunk:
+                break
+            buffer.write(chunk)
+            if buffer.tell() > self.max_bytes:
+                raise ImageRejected(f"Image is larger than {self.max_bytes // (1024 * 1024)}MB")
+        return buffer.getvalue()
+
+    def sniff(self, data: bytes) -> str:
+        """The image format named by the file signature, if it is an allowed one"""
+        for image_format, signatures in SIGNATURES.items():
+            if any(data.startswith(signature) for signature in signatures):
+                if image_format == "webp" and data[8:12] != b"WEBP":
+                    continue
+                if image_format not in self.allowed_formats:
+                    break
+                return image_format
+        allowed = ", ".join(sorted(self.allowed_formats)).upper()
+        raise ImageRejected(f"Unsupported image type; please upload {allowed}")
+
+    def cache_stats(self) -> Dict:
+        """Uploads processed and reused, and bytes before and after re-encoding"""
+        with self._lock:
+            stats = dict(self.stats, cached=len(self._cache))
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+        return stats
+
+    def _prepare(self, data: bytes, image_format: str) -> IngestedImage:
+        from PIL import Image, ImageOps
+
+        try:
+            image = Image.open(io.BytesIO(data))
+            resized = max(image.size) > self.max_dimension
+            # JPEGs can be decoded at a fraction of their size, which is much faster than decoding in full
+            image.draft("RGB", (self.max_dimension, self.max_dimension))
+            image.load()
+        except Exception as e:
+            raise ImageRejected(f"The image could not be read: {str(e)}")
+
+        # Phone photos are often stored sideways with an orientation tag
+        rotated = image.getexif().get(0x0112, 1) != 1
+        image = ImageOps.exif_transpose(image)
+        if resized:
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+        transparent = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        out = io.BytesIO()
+        if transparent:
+            image.save(out, format="PNG", optimize=True)
+            encoded_format = "png"
+        else:
+            image.convert("RGB").save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+            encoded_format = "jpeg"
+        encoded = out.getvalue()
+
+        # A small, already compressed upload is sent as it is
+        if not resized and not rotated and len(data) <= len(encoded):
+            encoded, encoded_format = data, image_format
+
+        pixels = hashlib.blake2b(digest_size=16)
+        pixels.update(f"{image.mode}:{image.size}".encode())
+        pixels.update(image.tobytes())
+        return IngestedImage(encoded, MIME_TYPES[encoded_format], image.width, image.height, len(data),
+                             pixels.hexdigest())
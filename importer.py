@@ -0,0 +1,322 @@
+"""Bulk import of student records from every layout the app has used
+
+    python importer.py                      # import into the configured backend
+    python importer.py --backend json --overwrite --batch-size 1000
+    python importer.py --reset-code 1001    # issue a new one-time reset code for one account
+
+Sources, in order of precedence (the first source that has an ID wins):
+
+    data/*.json          current schema, one file per student
+    student_data/*.json  legacy per-student files with a "subjects" tree
+    students.json        legacy single object keyed by student ID
+
+Records without a password are locked until their student sets one. Each gets a
+one-time reset code, written to ``--reset-codes`` for an administrator to hand out.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from codec import decode
+from config import DATA_DIR
+from progress_history import compact_progress
+from storage import StorageBackend, open_backend
+from student_manager import StudentManager, new_reset_code, new_student_record, reset_code_digest
+
+
+class ImportReport:
+    """Counters and per-record errors of an import run"""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.errors: List[Tuple[str, str, str]] = []  # (source, student_id, message)
+        self.reset_codes: List[Tuple[str, str]] = []  # (student_id, one-time code) of accounts without a password
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    @property
+    def throughput(self) -> float:
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"Imported {self.imported} records in {self.elapsed:.2f}s ({self.throughput:.0f} records/s)",
+            f"Skipped {self.skipped} records already present",
+            f"Failed {self.failed} records",
+            f"Locked {len(self.reset_codes)} records without a password until they are reset",
+        ]
+        for source, student_id, message in self.errors:
+            lines.append(f"  {source} [{student_id}]: {message}")
+        return "\n".join(lines)
+
+
+def iter_json_object(path: str, chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, object]]:
+    """Stream the ``key, value`` pairs of a top-level JSON object without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        def skip_whitespace() -> str:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not fill():
+                    return ""
+
+        def decode():
+            nonlocal position
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    # A value that ends exactly at the buffer edge may continue in the next chunk
+                    if end < len(buffer) or eof:
+                        position = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        if skip_whitespace() != "{":
+            raise ValueError(f"{path} does not contain a JSON object")
+        position += 1
+        while True:
+            token = skip_whitespace()
+            if token == "}":
+                return
+            if token == ",":
+                position += 1
+                continue
+            key = decode()
+            if skip_whitespace() != ":":
+                raise ValueError(f"{path}: expected ':' after key {key!r}")
+            position += 1
+            skip_whitespace()
+            yield key, decode()
+
+
+def iter_json_files(directory: str) -> Iterator[Tuple[str, object]]:
+    """Lazily yield ``(student_id, document)`` for every record file in a directory, in any codec format"""
+    if not os.path.isdir(directory):
+        return
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".json"):
+                student_id = entry.name[:-len(".json")]
+                try:
+                    with open(entry.path, 'rb') as f:
+                        yield student_id, decode(f.read())
+                except (OSError, ValueError) as e:
+                    yield student_id, e
+
+
+def normalize_current(document: Dict) -> Dict:
+    """Fill defaults missing from a record already in the current schema"""
+    record = new_student_record(document.get("name", ""), document.get("grade", 1),
+                                document.get("courses", []), document.get("password"))
+    record.update(document)
+    record.pop("_journal_seq", None)
+    if not record.get("password"):
+        record["needs_password_reset"] = True
+    record["progress"] = compact_progress(record.get("progress") or {})
+    return record
+
+
+def normalize_students_json(document: Dict) -> Dict:
+    """Convert an entry of the legacy ``students.json`` file"""
+    record = new_student_record(document.get("name", ""), document.get("grade", 1),
+                                document.get("courses", []), None)
+    # Legacy records carry no password; the account stays locked until the student sets one
+    record["needs_password_reset"] = True
+    joined = _iso(document.get("created_at")) or record["joined_date"]
+    record.update(joined_date=joined, last_active=joined)
+    for key in ("badges", "preferences"):
+        if key in document:
+            record[key] = document[key]
+    record["progress"] = compact_progress(document.get("progress") or {})
+    return record
+
+
+def normalize_student_data(document: Dict) -> Dict:
+    """Convert a legacy ``student_data/*.json`` file with per-subject topic trees"""
+    record = new_student_record(document.get("name", ""), document.get("grade", 1),
+                                document.get("courses", []), None)
+    # Legacy records carry no password; the account stays locked until the student sets one
+    record["needs_password_reset"] = True
+    joined = _iso(document.get("created_at")) or record["joined_date"]
+    record.update(joined_date=joined, last_active=joined)
+    for key in ("badges", "preferences"):
+        if key in document:
+            record[key] = document[key]
+
+    progress = {}
+    for subject, details in (document.get("subjects") or {}).items():
+        topics = {}
+        for topic, value in ((details or {}).get("topics") or {}).items():
+            scores = _scores(value)
+            if scores:
+                topics[topic] = scores
+        if topics:
+            progress[subject] = topics
+    record["progress"] = compact_progress(progress)
+    return record
+
+
+def run_import(backend: StorageBackend, data_dir: str = DATA_DIR, student_data_dir: str = "student_data",
+               students_json: str = "students.json", batch_size: int = 500,
+               overwrite: bool = False) -> ImportReport:
+    """Import all sources into ``backend`` in batches and report what happened"""
+    report = ImportReport()
+    seen = set()
+    batch = []
+
+    def flush() -> None:
+        if not batch:
+            return
+        try:
+            backend.save_many(batch)
+            report.imported += len(batch)
+        except Exception:
+            # Retry one by one so a single bad record does not sink its whole batch
+            for student_id, record in batch:
+                try:
+                    backend.save(student_id, record)
+                    report.imported += 1
+                except Exception as e:
+                    report.errors.append(("write", student_id, str(e)))
+        batch.clear()
+
+    sources = [
+        (data_dir, lambda: iter_json_files(data_dir), normalize_current),
+        (student_data_dir, lambda: iter_json_files(student_data_dir), normalize_student_data),
+    ]
+    if os.path.exists(students_json):
+        sources.append((students_json, lambda: iter_json_object(students_json), normalize_students_json))
+
+    for source, documents, normalize in sources:
+        # Importing a JSON backend's own directory into itself would only rewrite it
+        if backend.name == "json" and os.path.abspath(source) == os.path.abspath(backend.location):
+            continue
+        try:
+            for student_id, document in documents():
+                student_id = str(student_id)
+                if student_id in seen:
+                    report.skipped += 1
+                    continue
+                seen.add(student_id)
+                if not overwrite and backend.exists(student_id):
+                    report.skipped += 1
+                    continue
+                if isinstance(document, Exception):
+                    report.errors.append((source, student_id, str(document)))
+                    continue
+                if not isinstance(document, dict):
+                    report.errors.append((source, student_id, "record is not a JSON object"))
+                    continue
+                try:
+                    record = normalize(document)
+                except Exception as e:
+                    report.errors.append((source, student_id, str(e)))
+                    continue
+                if record.get("needs_password_reset"):
+                    code = new_reset_code()
+                    record["password_reset_code"] = reset_code_digest(code)
+                    report.reset_codes.append((student_id, code))
+                batch.append((student_id, record))
+                if len(batch) >= batch_size:
+                    flush()
+        except (OSError, ValueError) as e:
+            report.errors.append((source, "*", str(e)))
+    flush()
+
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def _iso(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        return None
+
+
+def _scores(value) -> List[float]:
+    """Extract a score list from the assorted shapes legacy topic entries take"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return [float(value)]
+    if isinstance(value, list):
+        return [float(v) for v in value if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if isinstance(value, dict):
+        for key in ("scores", "score", "overall_score"):
+            if key in value:
+                return _scores(value[key])
+    return []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import student records from all legacy layouts")
+    parser.add_argument("--backend", choices=["sqlite", "json"], help="target backend (default: STORAGE_BACKEND)")
+    parser.add_argument("--location", help="target database file or directory")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--student-data-dir", default="student_data")
+    parser.add_argument("--students-json", default="students.json")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--overwrite", action="store_true", help="replace records that already exist")
+    parser.add_argument("--reset-codes", default="reset_codes.csv",
+                        help="file the one-time reset codes of accounts without a password are written to")
+    parser.add_argument("--reset-code", metavar="STUDENT_ID", help="only issue a new reset code for one account")
+    args = parser.parse_args(argv)
+
+    backend = open_backend(args.backend, args.location)
+    if args.reset_code:
+        manager = StudentManager(backend)
+        if not manager.student_exists(args.reset_code):
+            print(f"Student ID not found: {args.reset_code}")
+            return 1
+        print(f"One-time reset code for {args.reset_code}: {manager.issue_reset_code(args.reset_code)}")
+        return 0
+
+    report = run_import(backend, args.data_dir, args.student_data_dir, args.students_json,
+                        args.batch_size, args.overwrite)
+    print(report.summary())
+    if report.reset_codes:
+        write_reset_codes(args.reset_codes, report.reset_codes)
+        print(f"Wrote the reset codes to {args.reset_codes}; give each student their own code")
+    return 1 if report.errors else 0
+
+
+def write_reset_codes(path: str, codes: List[Tuple[str, str]]) -> None:
+    """Write ``student_id,code`` lines readable by the owner only"""
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        f.write("student_id,reset_code\n")
+        for student_id, code in codes:
+            f.write(f"{student_id},{code}\n")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
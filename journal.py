@@ -0,0 +1,167 @@
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from codec import dumps, loads
+from progress_history import ScoreHistory
+
+# Events are single JSON lines. Every event carries an "op" and a "seq" number that
+# increases per student, so replay can skip events a snapshot already contains.
+#
+#   {"op": "score", "subject": ..., "topic": ..., "score": 80.0, "at": iso}
+#   {"op": "login", "at": iso}
+#   {"op": "badge", "badge": ..., "at": iso}
+#   {"op": "patch", "set": [[path, value], ...], "del": [path, ...]}
+
+
+def score_event(subject: str, topic: str, score: float) -> Dict:
+    return {"op": "score", "subject": subject, "topic": topic, "score": score, "at": datetime.now().isoformat()}
+
+
+def login_event() -> Dict:
+    return {"op": "login", "at": datetime.now().isoformat()}
+
+
+def badge_event(badge: str) -> Dict:
+    return {"op": "badge", "badge": badge, "at": datetime.now().isoformat()}
+
+
+def patch_event(data: Dict, changed) -> Dict:
+    """Build an event that sets or deletes the given section paths to their values in ``data``"""
+    sets, deletes = [], []
+    for path in sorted(changed):
+        if _has_path(data, path):
+            value = data
+            for key in path:
+                value = value[key]
+            sets.append([list(path), value])
+        else:
+            deletes.append(list(path))
+    return {"op": "patch", "set": sets, "del": deletes}
+
+
+def event_sections(event: Dict) -> List[Tuple[str, ...]]:
+    """Return the section paths an event reads and writes"""
+    op = event["op"]
+    if op == "score":
+        return [("progress", event["subject"], event["topic"]), ("last_active",)]
+    if op == "login":
+        return [("login_tracking",)]
+    if op == "badge":
+        return [("badges",)]
+    if op == "patch":
+        return [tuple(path) for path, _ in event["set"]] + [tuple(path) for path in event["del"]]
+    raise ValueError(f"Unknown journal event: {op}")
+
+
+def apply_event(data: Dict, event: Dict) -> None:
+    """Apply one journal event to a student record in place"""
+    op = event["op"]
+    if op == "score":
+        topics = data.setdefault("progress", {}).setdefault(event["subject"], {})
+        history = ScoreHistory.from_value(topics.get(event["topic"]))
+        topics[event["topic"]] = history.push(event["score"]).to_value()
+        data["last_active"] = event["at"]
+    elif op == "login":
+        tracking = data.get("login_tracking") or {"last_login": None, "login_streak": 0}
+        current_time = datetime.fromisoformat(event["at"])
+        if tracking.get("last_login"):
+            last_login = datetime.fromisoformat(tracking["last_login"])
+            days_diff = (current_time.date() - last_login.date()).days
+            if days_diff == 1:  # Consecutive day login
+                tracking["login_streak"] = tracking.get("login_streak", 0) + 1
+            elif days_diff > 1:  # Streak broken
+                tracking["login_streak"] = 1
+            # If same day login, keep streak as is
+        else:
+            # First time login
+            tracking["login_streak"] = 1
+        tracking["last_login"] = event["at"]
+        data["login_tracking"] = tracking
+    elif op == "badge":
+        badges = data.setdefault("badges", [])
+        if event["badge"] not in badges:
+            badges.append(event["badge"])
+    elif op == "patch":
+        for path in event["del"]:
+            _delete_path(data, path)
+        for path, value in event["set"]:
+            _set_path(data, path, value)
+    else:
+        raise ValueError(f"Unknown journal event: {op}")
+
+
+def read_events(path: str) -> Iterator[Dict]:
+    """Yield the complete events of a journal file, ignoring a torn final line"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # The process died mid-append; the partial event never happened
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
+
+
+def repair_tail(path: str) -> None:
+    """Truncate a torn final line so the next append starts on a fresh line"""
+    try:
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line
+            position = size
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    f.truncate(position + newline + 1)
+                    return
+            f.truncate(0)
+    except FileNotFoundError:
+        pass
+
+
+def append_line(path: str, event: Dict, fsync: bool = True) -> None:
+    """Append one event as a single write so concurrent appenders never interleave"""
+    line = dumps(event) + b"\n"
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _has_path(data: Dict, path) -> bool:
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return False
+        data = data[key]
+    return True
+
+
+def _set_path(data: Dict, path, value) -> None:
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+    data[path[-1]] = value
+
+
+def _delete_path(data: Dict, path) -> None:
+    for key in path[:-1]:
+        data = data.get(key)
+        if not isinstance(data, dict):
+            return
+    data.pop(path[-1], None)
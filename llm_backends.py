@@ -0,0 +1,213 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from config import (GEMINI_API_KEY, GEMINI_MODEL, GEMINI_VISION_MODEL, LLM_BACKEND, STUB_FAILURE_RATE,
+                    STUB_LATENCY, STUB_LATENCY_SIGMA, STUB_SEED, STUB_TOKENS_PER_SECOND)
+
+
+class LLMBackend:
+    """Interface for the language model behind the tutor
+
+    Responses expose ``.text``; with ``stream=True`` an iterable of chunks that each
+    expose ``.text`` is returned instead. Chat sessions expose ``history`` and
+    ``send_message(message, stream=False)`` like Gemini chat sessions.
+    """
+
+    name = ""
+
+    def start_chat(self, history: Optional[List] = None, system_instruction: Optional[str] = None):
+        """Start a multi-turn chat session"""
+        raise NotImplementedError
+
+    def generate(self, prompt: str, stream: bool = False):
+        """Answer a single stateless prompt"""
+        raise NotImplementedError
+
+    def vision(self, prompt: str, image_bytes: bytes, stream: bool = False, mime_type: str = "image/jpeg"):
+        """Answer a prompt about an image"""
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through ``google.generativeai``; the SDK is imported on first use"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL, vision_model_name: str = GEMINI_VISION_MODEL,
+                 api_key: Optional[str] = GEMINI_API_KEY):
+        self.model_name = model_name
+        self.vision_model_name = vision_model_name
+        self.api_key = api_key
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def start_chat(self, history: Optional[List] = None, system_instruction: Optional[str] = None):
+        return self._model(self.model_name, system_instruction).start_chat(history=history or [])
+
+    def generate(self, prompt: str, stream: bool = False):
+        return self._model(self.model_name).generate_content(prompt, stream=stream)
+
+    def vision(self, prompt: str, image_bytes: bytes, stream: bool = False, mime_type: str = "image/jpeg"):
+        # Sent as the encoded bytes, so the SDK does not decode and re-encode the image
+        image = {"mime_type": mime_type, "data": image_bytes}
+        return self._model(self.vision_model_name).generate_content([prompt, image] if prompt else [image],
+                                                                    stream=stream)
+
+    def _model(self, name: str, system_instruction: Optional[str] = None):
+        """Create a model handle on first use, configuring the SDK once"""
+        key = (name, system_instruction)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    import google.generativeai as genai
+
+                    if not self._models:
+                        genai.configure(api_key=self.api_key)
+                    model = genai.GenerativeModel(name, system_instruction=system_instruction) \
+                        if system_instruction else genai.GenerativeModel(name)
+                    self._models[key] = model
+        return model
+
+
+class ServiceUnavailable(Exception):
+    """Simulated upstream outage; named like the Google API error so retry policies treat it alike"""
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubBackend(LLMBackend):
+    """Deterministic offline model for benchmarks and capacity tests
+
+    Time to first token is drawn from a lognormal distribution with median
+    ``latency`` seconds and shape ``latency_sigma`` (0 makes it fixed); the text then
+    arrives at ``tokens_per_second`` (0 means instantly). A ``failure_rate``
+    fraction of calls raise ``ServiceUnavailable``. Prompts that ask for the JSON
+    formats of the tutor get well-formed JSON back so every code path can run.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = STUB_LATENCY, latency_sigma: float = STUB_LATENCY_SIGMA,
+                 tokens_per_second: float = STUB_TOKENS_PER_SECOND, failure_rate: float = STUB_FAILURE_RATE,
+                 seed: int = STUB_SEED):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "tokens": 0, "simulated_seconds": 0.0}
+
+    def start_chat(self, history: Optional[List] = None, system_instruction: Optional[str] = None):
+        return StubChatSession(self, history, system_instruction)
+
+    def generate(self, prompt: str, stream: bool = False):
+        return self._respond(prompt, stream)
+
+    def vision(self, prompt: str, image_bytes: bytes, stream: bool = False, mime_type: str = "image/jpeg"):
+        digest = hashlib.blake2b(image_bytes, digest_size=4).hexdigest()
+        return self._respond(f"{prompt or ''} [image {digest}]", stream)
+
+    def _respond(self, prompt: str, stream: bool, on_complete=None):
+        """Sleep out the simulated latency and return the reply, whole or as a chunk stream"""
+        with self._lock:
+            self.stats["calls"] += 1
+            failed = self._random.random() < self.failure_rate
+            delay = self.latency * math.exp(self.latency_sigma * self._random.gauss(0, 1)) if self.latency > 0 else 0.0
+            variant = self._random.getrandbits(32)
+            if failed:
+                self.stats["failures"] += 1
+        time.sleep(delay)
+        if failed:
+            raise ServiceUnavailable("Stub backend simulated an outage")
+
+        text = reply_for(prompt, variant)
+        tokens = re.findall(r"\S+\s*", text) or [text]
+        with self._lock:
+            self.stats["tokens"] += len(tokens)
+            self.stats["simulated_seconds"] += delay + (len(tokens) / self.tokens_per_second if self.tokens_per_second else 0)
+        if not stream:
+            if self.tokens_per_second:
+                time.sleep(len(tokens) / self.tokens_per_second)
+            if on_complete:
+                on_complete(text)
+            return StubResponse(text)
+        return self._stream(tokens, text, on_complete)
+
+    def _stream(self, tokens: List[str], text: str, on_complete) -> Iterator[StubResponse]:
+        for token in tokens:
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield StubResponse(token)
+        if on_complete:
+            on_complete(text)
+
+
+class StubChatSession:
+    """Chat session of the stub backend; history uses Gemini's ``{"role", "parts"}`` shape"""
+
+    def __init__(self, backend: StubBackend, history: Optional[List] = None, system_instruction: Optional[str] = None):
+        self.backend = backend
+        self.history = list(history or [])
+        self.system_instruction = system_instruction
+
+    def send_message(self, message: str, stream: bool = False):
+        def record(text: str) -> None:
+            self.history += [{"role": "user", "parts": [message]}, {"role": "model", "parts": [text]}]
+
+        return self.backend._respond(message, stream, on_complete=record)
+
+
+def reply_for(prompt: str, variant: int = 0) -> str:
+    """Deterministic reply to a prompt, in the JSON shape the tutor's prompts ask for
+
+    Different ``variant`` values give different replies to the same prompt, as
+    repeated calls to a real model would.
+    """
+    seed = int(hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest(), 16) ^ variant
+    rng = random.Random(seed)
+    count = re.search(r"Generate (\d+)", prompt)
+    count = int(count.group(1)) if count else 1
+
+    if "multiple-choice questions" in prompt:
+        questions = []
+        for i in range(count):
+            options = [f"{letter}) Option {letter} of question {seed % 10000}-{i}" for letter in "ABCD"]
+            questions.append({"question": f"Stub question {seed % 10000}-{i}?", "options": options,
+                              "correct_answer": rng.choice(options), "explanation": "Stub explanation."})
+        return json.dumps(questions)
+    if "open-ended questions" in prompt:
+        return json.dumps([
+            {"question": f"Stub open question {seed % 10000}-{i}?", "key_points": ["point one", "point two"],
+             "sample_answer": "A stub sample answer.", "evaluation_criteria": "Stub criteria."}
+            for i in range(count)
+        ])
+    answers = re.findall(r"^\s*Answer (\d+)$", prompt, re.MULTILINE)
+    if answers:
+        return json.dumps([{"answer": int(n), "score": rng.randint(40, 100), "feedback": "Stub feedback."}
+                           for n in answers])
+    if '{"score"' in prompt:
+        return json.dumps({"score": rng.randint(40, 100), "feedback": "Stub feedback."})
+    words = ["concept", "example", "practice", "detail", "step", "idea", "method", "result"]
+    return " ".join(rng.choice(words) for _ in range(40 + seed % 80)) + "."
+
+
+def open_llm_backend(name: Optional[str] = None) -> LLMBackend:
+    """Create the LLM backend called ``name`` (defaults to ``config.LLM_BACKEND``)"""
+    name = name or LLM_BACKEND
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
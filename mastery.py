@@ -0,0 +1,86 @@
+import heapq
+import itertools
+from typing import Dict, List, Tuple
+
+from config import ALLOWED_SUBJECTS, MASTERY_THRESHOLD, SUBJECT_ALIASES, SUBJECT_TOPICS
+from progress_history import ScoreHistory
+
+UNATTEMPTED = -1.0  # Heap priority of topics without scores; sorts ahead of any real mastery
+
+
+def canonical_subject(subject: str) -> str:
+    """Map any subject spelling used by the app or older records to its ALLOWED_SUBJECTS key"""
+    key = subject.strip().lower().replace(" ", "_")
+    return SUBJECT_ALIASES.get(key, key)
+
+
+class MasteryIndex:
+    """Per-student min-heaps of topic mastery, one per subject
+
+    Each topic tracks the running score count and total so a new score updates its
+    mastery in O(log n) without touching the stored history. Replaced heap entries
+    are left in place and skipped when popped.
+    """
+
+    def __init__(self, progress: Dict, version=None):
+        self.version = version
+        self._counter = itertools.count()
+        self._totals: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        self._entries: Dict[str, Dict[str, list]] = {}
+        self._heaps: Dict[str, list] = {}
+
+        for subject in ALLOWED_SUBJECTS:
+            for topic in SUBJECT_TOPICS.get(subject, []):
+                self._set(subject, topic, 0, 0.0)
+        for subject, topics in progress.items():
+            if not isinstance(topics, dict):
+                continue
+            subject = canonical_subject(subject)
+            for topic, scores in topics.items():
+                history = ScoreHistory.from_value(scores)
+                count, total = self._totals.get(subject, {}).get(topic, (0, 0.0))
+                # Older records may hold the same topic under several subject spellings
+                self._set(subject, topic, count + history.count, total + history.total)
+
+    def record(self, subject: str, topic: str, score: float) -> None:
+        """Fold one new score into the index"""
+        subject = canonical_subject(subject)
+        count, total = self._totals.get(subject, {}).get(topic, (0, 0.0))
+        self._set(subject, topic, count + 1, total + float(score))
+
+    def mastery(self, subject: str, topic: str) -> float:
+        """Average mastery of a topic as a fraction, or ``UNATTEMPTED``"""
+        count, total = self._totals.get(canonical_subject(subject), {}).get(topic, (0, 0.0))
+        return total / count / 100 if count else UNATTEMPTED
+
+    def recommend(self, subject: str, limit: int = 3, threshold: float = MASTERY_THRESHOLD) -> List[str]:
+        """Return up to ``limit`` unattempted or weakest topics below ``threshold``"""
+        heap = self._heaps.get(canonical_subject(subject), [])
+        picked = []
+        while heap and len(picked) < limit:
+            entry = heapq.heappop(heap)
+            if entry[2] is None:
+                continue  # Superseded by a newer entry for the same topic
+            if entry[0] >= threshold:
+                heapq.heappush(heap, entry)
+                break
+            picked.append(entry)
+        for entry in picked:
+            heapq.heappush(heap, entry)
+        return [entry[2] for entry in picked]
+
+    def _set(self, subject: str, topic: str, count: int, total: float) -> None:
+        self._totals.setdefault(subject, {})[topic] = (count, total)
+        entries = self._entries.setdefault(subject, {})
+        previous = entries.get(topic)
+        if previous is not None:
+            previous[2] = None
+        priority = total / count / 100 if count else UNATTEMPTED
+        entry = [priority, next(self._counter), topic]
+        entries[topic] = entry
+        heap = self._heaps.setdefault(subject, [])
+        heapq.heappush(heap, entry)
+        if len(heap) > 2 * len(entries) + 16:
+            # Drop superseded entries so the heap stays proportional to the topic count
+            heap[:] = [item for item in heap if item[2] is not None]
+            heapq.heapify(heap)
@@ -0,0 +1,200 @@
+import functools
+import hashlib
+import io
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from config import OCR_CACHE_ENTRIES, OCR_LANGUAGE, OCR_MAX_DIMENSION, OCR_MAX_SKEW, OCR_TESSERACT_CONFIG, OCR_WORKERS
+
+
+def preprocess(image, max_dimension: int = OCR_MAX_DIMENSION, max_skew: float = OCR_MAX_SKEW):
+    """Grayscale, binarize and deskew an image for Tesseract; returns ``(image, skew angle)``"""
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    gray = ImageOps.autocontrast(ImageOps.grayscale(image))
+    threshold = otsu_threshold(gray.histogram())
+    binary = gray.point(lambda value: 255 if value > threshold else 0, mode="L")
+
+    angle = estimate_skew(binary, max_skew) if max_skew else 0.0
+    if angle:
+        binary = binary.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=255)
+    return binary, angle
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Gray level that best separates a 256-bin histogram into ink and paper"""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def estimate_skew(binary, max_skew: float) -> float:
+    """Rotation in degrees that straightens the text lines of a binarized page
+
+    Text lines are level when the ink per pixel row varies the most, so candidate
+    angles are tried on a small copy, first in whole degrees and then in tenths.
+    """
+    from PIL import Image, ImageOps
+
+    small = ImageOps.invert(binary)  # Ink as bright pixels, so rotation fills with empty paper
+    small.thumbnail((800, 800), Image.NEAREST)
+
+    def score(angle: float) -> float:
+        rotated = small.rotate(angle, resample=Image.NEAREST, expand=True)
+        rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(rows) / len(rows)
+        return sum((value - mean) ** 2 for value in rows)
+
+    best = max(range(-int(max_skew), int(max_skew) + 1), key=score, default=0)
+    fine = [best + step / 10 for step in range(-9, 10)]
+    angle = max(fine, key=score)
+    return round(angle, 1) if abs(angle) >= 0.2 else 0.0
+
+
+def recognize(data: bytes, language: str = OCR_LANGUAGE, config: str = OCR_TESSERACT_CONFIG,
+              max_dimension: int = OCR_MAX_DIMENSION, max_skew: float = OCR_MAX_SKEW) -> Dict:
+    """OCR one encoded image: ``{"text", "confidence", "words", "skew"}``
+
+    Confidence is Tesseract's mean word confidence as a fraction, 0 when nothing was
+    read. Runs in the worker processes of ``OCREngine``, so it only takes and returns
+    picklable values.
+    """
+    import pytesseract
+    from PIL import Image
+
+    image, angle = preprocess(Image.open(io.BytesIO(data)), max_dimension, max_skew)
+    found = pytesseract.image_to_data(image, lang=language, config=config, output_type=pytesseract.Output.DICT)
+
+    lines = OrderedDict()  # (block, paragraph, line) -> words
+    confidences = []
+    for i, word in enumerate(found["text"]):
+        confidence = float(found["conf"][i])
+        if not word.strip() or confidence < 0:
+            continue
+        lines.setdefault((found["block_num"][i], found["par_num"][i], found["line_num"][i]), []).append(word)
+        confidences.append(confidence)
+
+    text, previous = [], None
+    for (block, paragraph, _), words in lines.items():
+        if previous is not None and previous != (block, paragraph):
+            text.append("")  # Blank line between paragraphs
+        text.append(" ".join(words))
+        previous = (block, paragraph)
+    return {
+        "text": "\n".join(text),
+        "confidence": round(sum(confidences) / len(confidences) / 100, 3) if confidences else 0.0,
+        "words": len(confidences),
+        "skew": angle,
+    }
+
+
+class OCREngine:
+    """Tesseract OCR with page preprocessing, a result cache and a process pool for batches
+
+    Results are cached by a hash of the image bytes and the OCR settings, keeping the
+    last ``cache_entries``. A single page is read in the calling thread; a batch is
+    spread over ``workers`` processes, since Tesseract is CPU-bound.
+    """
+
+    def __init__(self, language: str = OCR_LANGUAGE, config: str = OCR_TESSERACT_CONFIG,
+                 max_dimension: int = OCR_MAX_DIMENSION, max_skew: float = OCR_MAX_SKEW,
+                 workers: int = OCR_WORKERS, cache_entries: int = OCR_CACHE_ENTRIES):
+        self.language = language
+        self.config = config
+        self.max_dimension = max_dimension
+        self.max_skew = max_skew
+        self.workers = workers
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()  # key -> result
+        self._lock = threading.Lock()
+        self._pool = None
+        self.stats = {"pages": 0, "hits": 0, "misses": 0}
+
+    def recognize(self, data: bytes, language: Optional[str] = None) -> Dict:
+        """OCR result of one encoded image"""
+        return self.recognize_batch([data], language)[0]
+
+    def recognize_batch(self, pages: List[bytes], language: Optional[str] = None) -> List[Dict]:
+        """OCR results of several encoded images, in order"""
+        language = language or self.language
+        keys = [self._key(data, language) for data in pages]
+        results = [self._cached(key) for key in keys]
+
+        # Identical pages in one batch are read once
+        missing = OrderedDict()
+        for i, result in enumerate(results):
+            if result is None:
+                missing.setdefault(keys[i], pages[i])
+        read = functools.partial(recognize, language=language, config=self.config,
+                                 max_dimension=self.max_dimension, max_skew=self.max_skew)
+        if len(missing) > 1:
+            found = list(self._executor().map(read, missing.values()))
+        else:
+            found = [read(data) for data in missing.values()]
+
+        new = dict(zip(missing, found))
+        with self._lock:
+            for key, result in new.items():
+                self._cache[key] = result
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+            self.stats["pages"] += len(pages)
+            self.stats["misses"] += len(new)
+            self.stats["hits"] += len(pages) - len(new)
+        return [dict(result if result is not None else new[key]) for key, result in zip(keys, results)]
+
+    def cache_stats(self) -> Dict:
+        """Pages read, cache hits and hit rate"""
+        with self._lock:
+            stats = dict(self.stats, cached=len(self._cache))
+        stats["hit_rate"] = stats["hits"] / stats["pages"] if stats["pages"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _key(self, data: bytes, language: str) -> str:
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(f"\x1f{language}\x1f{self.config}\x1f{self.max_dimension}\x1f{self.max_skew}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Forking the multi-threaded app server could copy locks held by other threads
+                # into the workers, so they start fresh interpreters instead
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
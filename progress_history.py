@@ -0,0 +1,107 @@
+import base64
+import sys
+from array import array
+from typing import Dict, List, Optional, Union
+
+from config import PROGRESS_EWMA_ALPHA, PROGRESS_HISTORY_CAPACITY
+
+
+class ScoreHistory:
+    """Fixed-capacity ring buffer of recent scores with running aggregates over all attempts
+
+    The last ``capacity`` scores live in a packed float array; count, sum, min, max
+    and an exponentially weighted moving average cover every attempt ever recorded,
+    so averages are O(1) and the stored size does not grow with practice volume.
+    """
+
+    __slots__ = ("capacity", "_scores", "_head", "count", "total", "minimum", "maximum", "ewma")
+
+    def __init__(self, capacity: int = PROGRESS_HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._scores = array('d', bytes(8 * capacity))
+        self._head = 0  # Slot the next score is written to
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.ewma: Optional[float] = None
+
+    def push(self, score: float) -> "ScoreHistory":
+        """Record one score, overwriting the oldest once the buffer is full"""
+        score = float(score)
+        self._scores[self._head] = score
+        self._head = (self._head + 1) % self.capacity
+        self.count += 1
+        self.total += score
+        self.minimum = score if self.minimum is None else min(self.minimum, score)
+        self.maximum = score if self.maximum is None else max(self.maximum, score)
+        self.ewma = score if self.ewma is None else PROGRESS_EWMA_ALPHA * score + (1 - PROGRESS_EWMA_ALPHA) * self.ewma
+        return self
+
+    @property
+    def mean(self) -> float:
+        """Average over all recorded attempts"""
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def mastery(self) -> float:
+        """Average score as a fraction between 0 and 1 (scores are recorded as percentages)"""
+        return self.mean / 100
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def recent(self) -> List[float]:
+        """Scores still in the buffer, oldest first"""
+        size = len(self)
+        start = (self._head - size) % self.capacity
+        return [self._scores[(start + i) % self.capacity] for i in range(size)]
+
+    def to_value(self) -> Dict:
+        """Encode as a JSON-safe dict whose size depends only on the capacity"""
+        scores = array('d', self._scores)
+        if sys.byteorder != "little":
+            scores.byteswap()
+        return {
+            "capacity": self.capacity,
+            "head": self._head,
+            "count": self.count,
+            "sum": self.total,
+            "min": self.minimum,
+            "max": self.maximum,
+            "ewma": self.ewma,
+            "scores": base64.b64encode(scores.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_value(cls, value: Union[Dict, List, None]) -> "ScoreHistory":
+        """Decode a stored history; plain score lists from older records are replayed into a buffer"""
+        if isinstance(value, dict) and "scores" in value:
+            history = cls(value["capacity"])
+            scores = array('d')
+            scores.frombytes(base64.b64decode(value["scores"]))
+            if sys.byteorder != "little":
+                scores.byteswap()
+            history._scores = scores
+            history._head = value["head"]
+            history.count = value["count"]
+            history.total = value["sum"]
+            history.minimum = value["min"]
+            history.maximum = value["max"]
+            history.ewma = value["ewma"]
+            return history
+
+        history = cls()
+        for score in value if isinstance(value, list) else []:
+            if isinstance(score, (int, float)) and not isinstance(score, bool):
+                history.push(score)
+        return history
+
+
+def compact_progress(progress: Dict) -> Dict:
+    """Convert every topic of a ``progress`` section to the compact history encoding"""
+    return {
+        subject: {topic: ScoreHistory.from_value(scores).to_value() for topic, scores in topics.items()}
+        for subject, topics in progress.items()
+        if isinstance(topics, dict)
+    }
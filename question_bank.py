@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import QUESTION_BANK_LOW_WATERMARK, QUESTION_BANK_PATH, QUESTION_BANK_REFILL_BATCH
+from response_cache import normalize_question
+from sqlite_util import ThreadConnections
+
+# A pool holds the questions of one (subject, topic, difficulty, question_type)
+Pool = Tuple[str, str, str, str]
+
+
+class QuestionBank:
+    """Persistent pools of generated practice questions with per-student seen tracking
+
+    Requests are served from the pool without waiting on the model. Whenever fewer
+    than ``low_watermark`` questions of a pool are left unseen by the requesting
+    student, a background worker generates ``refill_batch`` more. ``generate`` is
+    called as ``generate(subject, topic, difficulty, question_type, count)`` and
+    returns a list of question dicts.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS questions (
+            question_id   INTEGER PRIMARY KEY,
+            subject       TEXT NOT NULL,
+            topic         TEXT NOT NULL,
+            difficulty    TEXT NOT NULL,
+            question_type TEXT NOT NULL,
+            fingerprint   TEXT NOT NULL,
+            body          TEXT NOT NULL,
+            created       REAL NOT NULL,
+            UNIQUE (subject, topic, difficulty, question_type, fingerprint)
+        );
+
+        CREATE TABLE IF NOT EXISTS seen (
+            student_id  TEXT NOT NULL,
+            question_id INTEGER NOT NULL,
+            seen_at     REAL NOT NULL,
+            PRIMARY KEY (student_id, question_id)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, generate: Callable[..., List[Dict]], path: str = QUESTION_BANK_PATH,
+                 low_watermark: int = QUESTION_BANK_LOW_WATERMARK,
+                 refill_batch: int = QUESTION_BANK_REFILL_BATCH):
+        self.generate = generate
+        self.path = path
+        self.low_watermark = low_watermark
+        self.refill_batch = refill_batch
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connections = ThreadConnections(self.path)
+        self._connection().executescript(self.SCHEMA)
+        # One refill worker is plenty; it only ever waits on the model
+        self._refills = ThreadPoolExecutor(max_workers=1, thread_name_prefix="question-bank")
+        self._refilling = set()
+        self._refilling_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"served": 0, "short": 0, "refills": 0, "generated": 0, "refill_errors": 0}
+
+    def take(self, pool: Pool, count: int, student_id: Optional[str] = None, refill: bool = True) -> List[Dict]:
+        """Serve up to ``count`` questions the student has not seen yet and mark them seen"""
+        conn = self._connection()
+        rows = conn.execute(
+            """SELECT q.question_id, q.body FROM questions q
+               WHERE q.subject = ? AND q.topic = ? AND q.difficulty = ? AND q.question_type = ?
+                 AND NOT EXISTS (SELECT 1 FROM seen s WHERE s.student_id = ? AND s.question_id = q.question_id)
+               ORDER BY q.question_id LIMIT ?""",
+            (*pool, student_id or "", count)
+        ).fetchall()
+        if student_id and rows:
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen (student_id, question_id, seen_at) VALUES (?, ?, ?)",
+                [(student_id, question_id, now) for question_id, _ in rows]
+            )
+        self.stats["served"] += len(rows)
+        if len(rows) < count:
+            self.stats["short"] += 1
+
+        if refill:
+            self.top_up(pool, student_id)
+        return [json.loads(body) for _, body in rows]
+
+    def add(self, pool: Pool, questions: List[Dict]) -> int:
+        """Store generated questions, skipping ones already in the pool; returns how many were new"""
+        now = time.time()
+        cursor = self._connection().executemany(
+            """INSERT OR IGNORE INTO questions
+               (subject, topic, difficulty, question_type, fingerprint, body, created)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (*pool, _fingerprint(question), json.dumps(question), now)
+                for question in questions
+                if isinstance(question, dict) and question.get("question")
+            ]
+        )
+        return cursor.rowcount
+
+    def unseen(self, pool: Pool, student_id: Optional[str] = None) -> int:
+        """Number of questions in a pool the student has not been served"""
+        return self._connection().execute(
+            """SELECT COUNT(*) FROM questions q
+               WHERE q.subject = ? AND q.topic = ? AND q.difficulty = ? AND q.question_type = ?
+                 AND NOT EXISTS (SELECT 1 FROM seen s WHERE s.student_id = ? AND s.question_id = q.question_id)""",
+            (*pool, student_id or "")
+        ).fetchone()[0]
+
+    def top_up(self, pool: Pool, student_id: Optional[str] = None) -> None:
+        """Queue a refill when the student is running low on unseen questions of a pool"""
+        if self.unseen(pool, student_id) < self.low_watermark:
+            self.request_refill(pool)
+
+    def request_refill(self, pool: Pool) -> None:
+        """Top a pool up in the background unless a refill for it is already queued"""
+        with self._refilling_lock:
+            if pool in self._refilling:
+                return
+            self._refilling.add(pool)
+        self._refills.submit(self._refill, pool)
+
+    def close(self) -> None:
+        """Drop queued refills and wait for the one in progress"""
+        self._closed = True
+        self._refills.shutdown(wait=True)
+
+    def _refill(self, pool: Pool) -> None:
+        try:
+            if self._closed:
+                return
+            questions = self.generate(*pool, self.refill_batch)
+            self.stats["generated"] += self.add(pool, questions or [])
+            self.stats["refills"] += 1
+        except Exception as e:
+            self.stats["refill_errors"] += 1
+            print(f"Question bank refill failed for {pool}: {str(e)}")
+        finally:
+            with self._refilling_lock:
+                self._refilling.discard(pool)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+
+def _fingerprint(question: Dict) -> str:
+    """Identify a question by its normalized text so regenerated duplicates are dropped"""
+    return hashlib.blake2b(normalize_question(question["question"]).encode("utf-8"), digest_size=16).hexdigest()
@@ -0,0 +1,169 @@
+import contextlib
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, Iterator, Optional
+
+from config import GEMINI_BURST, GEMINI_REQUESTS_PER_MINUTE, RATE_LIMIT_MAX_WAIT
+
+# Request priorities, most urgent first
+CHAT = 0
+GRADING = 1
+GENERATION = 2
+PREFETCH = 3
+PRIORITY_NAMES = {CHAT: "chat", GRADING: "grading", GENERATION: "generation", PREFETCH: "prefetch"}
+
+
+class RateLimitTimeout(Exception):
+    """A request waited longer than its limit for a rate limiter token
+
+    Not a ``TimeoutError``: the wait is local queueing and says nothing about the
+    health of the model service, so retry and circuit breaker policies ignore it.
+    """
+
+
+class _Waiter:
+    __slots__ = ("cost", "enqueued", "granted")
+
+    def __init__(self, cost: float):
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.granted = False
+
+
+class RateLimiter:
+    """Token bucket shared by all model calls, granting tokens by priority and fair share
+
+    Tokens refill at ``rate_per_minute`` up to ``burst``. Waiting requests are served
+    strictly by priority; within a priority every student gets a turn in round-robin
+    order, so one student's batch of calls cannot starve the rest of the class.
+    """
+
+    def __init__(self, rate_per_minute: float = GEMINI_REQUESTS_PER_MINUTE, burst: float = GEMINI_BURST,
+                 max_wait: Optional[float] = RATE_LIMIT_MAX_WAIT):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._local = threading.local()  # Deadline of the calling thread's request, if any
+        # priority -> student -> waiters; student order is the round-robin order
+        self._queues: Dict[int, OrderedDict] = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._stats = {
+            priority: {"granted": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+    def acquire(self, priority: int = CHAT, student_id: Hashable = None, cost: float = 1.0,
+                timeout: Optional[float] = None) -> float:
+        """Block until the request may go out; returns the seconds waited"""
+        timeout = self.max_wait if timeout is None else timeout
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        waiter = _Waiter(min(cost, self.burst))
+        with self._condition:
+            self._queues[priority].setdefault(student_id, deque()).append(waiter)
+            while True:
+                self._refill()
+                self._dispatch()
+                if waiter.granted:
+                    return self._record(priority, waiter)
+                waited = time.monotonic() - waiter.enqueued
+                if timeout is not None and waited >= timeout:
+                    self._remove(priority, student_id, waiter)
+                    self._stats[priority]["timeouts"] += 1
+                    # Our place in line may have been what blocked the next waiter
+                    self._condition.notify_all()
+                    raise RateLimitTimeout(f"Waited {waited:.1f}s for a model call slot")
+                # Sleep until roughly when the next token is due, or until woken by a grant
+                shortfall = max(self._head_cost() - self._tokens, 0.0)
+                delay = shortfall / self.rate if self.rate > 0 else None
+                if timeout is not None:
+                    remaining = timeout - waited
+                    delay = remaining if delay is None else min(delay, remaining)
+                self._condition.wait(delay)
+
+    @contextlib.contextmanager
+    def deadline(self, deadline: Optional[float]) -> Iterator[None]:
+        """Within the block, this thread stops queueing for tokens at ``deadline`` (``time.monotonic()``)
+
+        Lets a caller that gives up on a request at its deadline keep the worker thread
+        still running it from taking a token for an answer nobody will read.
+        """
+        previous = getattr(self._local, "deadline", None)
+        self._local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def stats(self) -> Dict:
+        """Queue depth, grants, timeouts and wait times per priority"""
+        with self._condition:
+            self._refill()
+            report = {"tokens": self._tokens}
+            for priority, name in PRIORITY_NAMES.items():
+                stats = self._stats[priority]
+                queue = self._queues[priority]
+                report[name] = dict(
+                    stats,
+                    queued=sum(len(waiters) for waiters in queue.values()),
+                    students_waiting=len(queue),
+                    wait_avg=stats["wait_total"] / stats["granted"] if stats["granted"] else 0.0,
+                )
+            return report
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self) -> None:
+        """Grant tokens to queued requests in priority then round-robin order; caller holds the lock"""
+        granted = False
+        while True:
+            head = self._head()
+            if head is None or head[2].cost > self._tokens:
+                break
+            priority, student_id, waiter = head
+            queue = self._queues[priority]
+            queue[student_id].popleft()
+            if queue[student_id]:
+                queue.move_to_end(student_id)  # The student's next request waits for everyone else's turn
+            else:
+                del queue[student_id]
+            self._tokens -= waiter.cost
+            waiter.granted = True
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _head(self):
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            if queue:
+                student_id, waiters = next(iter(queue.items()))
+                return priority, student_id, waiters[0]
+        return None
+
+    def _head_cost(self) -> float:
+        head = self._head()
+        return head[2].cost if head else 0.0
+
+    def _remove(self, priority: int, student_id: Hashable, waiter: _Waiter) -> None:
+        waiters = self._queues[priority].get(student_id)
+        if waiters is not None:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[priority][student_id]
+
+    def _record(self, priority: int, waiter: _Waiter) -> float:
+        waited = time.monotonic() - waiter.enqueued
+        stats = self._stats[priority]
+        stats["granted"] += 1
+        stats["wait_total"] += waited
+        stats["wait_max"] = max(stats["wait_max"], waited)
+        return waited
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config import (RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MEMORY_ENTRIES, RESPONSE_CACHE_PATH,
+                    RESPONSE_CACHE_TTL)
+from sqlite_util import ThreadConnections
+
+
+def normalize_question(question: Optional[str]) -> str:
+    """Fold case, whitespace and trailing punctuation so near-identical questions share a key"""
+    text = re.sub(r"\s+", " ", (question or "").strip().lower())
+    return text.rstrip(" ?!.")
+
+
+def content_hash(data: bytes) -> str:
+    """Hash of raw content such as an uploaded image"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def cache_key(question: Optional[str], subject: str, grade_level, language: str,
+              image_hash: Optional[str] = None, history_digest: Optional[str] = None) -> str:
+    """Key of a tutor response; image questions are keyed by the image content as well
+
+    Follow-up questions depend on the conversation before them, so chat questions
+    asked after earlier exchanges are keyed by a digest of that history too.
+    """
+    parts = [normalize_question(question), str(subject), str(grade_level), str(language), image_hash or "",
+             history_digest or ""]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of tutor responses: an in-memory LRU in front of a SQLite file
+
+    Entries expire ``ttl`` seconds after they were generated. The memory tier holds
+    at most ``memory_entries`` responses; the disk tier evicts least recently used
+    entries once it holds more than ``max_bytes`` of text. Each entry remembers how
+    long generating it took, which is reported as latency saved on every hit.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key       TEXT PRIMARY KEY,
+            response  TEXT NOT NULL,
+            latency   REAL NOT NULL,
+            created   REAL NOT NULL,
+            last_used REAL NOT NULL,
+            size      INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+    """
+
+    def __init__(self, path: Optional[str] = RESPONSE_CACHE_PATH, ttl: float = RESPONSE_CACHE_TTL,
+                 memory_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()  # key -> (response, latency, created)
+        self._lock = threading.Lock()
+        self._connections = ThreadConnections(self.path) if self.path else None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0,
+                       "stores": 0, "evictions": 0, "latency_saved": 0.0}
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection().executescript(self.SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or ``None`` on a miss"""
+        now = time.time()
+        expired = False
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[2] > self.ttl:
+                del self._memory[key]
+                expired = True
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                self._stats["latency_saved"] += entry[1]
+                return entry[0]
+
+        row = None
+        if self.path:
+            conn = self._connection()
+            row = conn.execute("SELECT response, latency, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                expired = True
+                row = None
+            if row is not None:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                self._stats["expired"] += expired
+                return None
+            self._stats["disk_hits"] += 1
+            self._stats["latency_saved"] += row[1]
+            self._remember(key, tuple(row))
+        return row[0]
+
+    def put(self, key: str, response: str, latency: float) -> None:
+        """Store a freshly generated response along with how long generating it took"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, (response, latency, now))
+            self._stats["stores"] += 1
+        if not self.path:
+            return
+        size = len(response.encode("utf-8"))
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, latency, created, last_used, size) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, response, latency, now, now, size)
+        )
+        self._evict(conn)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        """Hit, miss and eviction counters plus the total generation time saved, in seconds"""
+        with self._lock:
+            stats = dict(self._stats, memory_entries=len(self._memory))
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        if self.path:
+            count, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats.update(disk_entries=count, disk_bytes=size)
+        return stats
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        """Insert into the memory tier; caller holds the lock"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > max(self.memory_entries, 0):
+            self._memory.popitem(last=False)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop expired entries, then least recently used ones until the disk tier fits its budget"""
+        conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._stats["evictions"] += evicted
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
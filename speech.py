@@ -0,0 +1,214 @@
+import os
+import re
+import threading
+import time
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from audio_cache import AudioCache, audio_key
+from config import TTS_CHUNK_CHARS, TTS_WORKERS
+
+# A sentence ends at terminal punctuation followed by whitespace, or at a line break
+SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, dropping empty pieces"""
+    return [sentence.strip() for sentence in SENTENCE_END.split(text or "") if sentence.strip()]
+
+
+class SpeechJob:
+    """Speech for one answer, synthesized chunk by chunk while its text arrives
+
+    ``feed`` takes text as it streams in and queues complete sentences: the first one
+    on its own so audio starts as early as possible, later ones grouped into chunks of
+    about ``chunk_chars`` characters. ``close`` queues whatever is left. Chunks depend
+    only on the text, not on how it arrived, so cached answers reuse cached audio.
+    """
+
+    def __init__(self, pipeline: "SpeechPipeline", language: str, started: Optional[float] = None):
+        self.pipeline = pipeline
+        self.language = language
+        self.started = started if started is not None else time.perf_counter()
+        self.first_audio_latency = None  # Seconds from ``started`` until the first chunk was playable
+        self.text = ""
+        self._buffer = ""
+        self._pending = ""
+        self._futures: List[Future] = []
+        self._closed = False
+        self._audio_file = None
+
+    def feed(self, text: str) -> None:
+        """Add streamed text, queueing synthesis of the sentences it completes"""
+        self.text += text
+        self._buffer += text
+        end = None
+        for match in SENTENCE_END.finditer(self._buffer):
+            end = match.end()
+        if end is None:
+            return
+        for sentence in split_sentences(self._buffer[:end]):
+            self._add(sentence)
+        self._buffer = self._buffer[end:]
+
+    def close(self) -> "SpeechJob":
+        """Queue the remaining text; no more text will be fed"""
+        if not self._closed:
+            self._closed = True
+            for sentence in split_sentences(self._buffer):
+                self._add(sentence)
+            self._buffer = ""
+            if self._pending:
+                self._submit(self._pending)
+                self._pending = ""
+        return self
+
+    def cancel(self) -> None:
+        """Drop chunks that have not started synthesizing"""
+        self._closed = True
+        for future in self._futures:
+            future.cancel()
+
+    def chunks(self) -> Iterator[str]:
+        """Yield the audio file of each chunk in order, as soon as it is ready"""
+        for future in list(self._futures):
+            path = self._result(future)
+            if path:
+                yield path
+
+    def first_chunk(self) -> Optional[str]:
+        """Audio file of the first chunk if it is already synthesized, without waiting"""
+        if not self._futures or not self._futures[0].done():
+            return None
+        return self._result(self._futures[0])
+
+    def audio_file(self) -> Optional[str]:
+        """Wait for every chunk and return a single file of the whole answer"""
+        self.close()
+        if self._audio_file is None:
+            paths = list(self.chunks())
+            if len(paths) == 1:
+                self._audio_file = paths[0]
+            elif paths:
+                self._audio_file = self.pipeline.concatenate(self.text, self.language, paths)
+        return self._audio_file
+
+    def _add(self, sentence: str) -> None:
+        """Queue the first sentence at once and group later ones into chunks"""
+        if not self._futures:
+            self._submit(sentence)
+        elif self._pending and len(self._pending) + len(sentence) + 1 > self.pipeline.chunk_chars:
+            # Later chunks only need to be ready before the previous one finishes playing
+            self._submit(self._pending)
+            self._pending = sentence
+        else:
+            self._pending = f"{self._pending} {sentence}" if self._pending else sentence
+
+    def _submit(self, chunk: str) -> None:
+        chunk = " ".join(chunk.split())
+        if not chunk:
+            return
+        future = self.pipeline.submit(chunk, self.language)
+        if not self._futures:
+            future.add_done_callback(self._first_audio)
+        self._futures.append(future)
+
+    def _first_audio(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self.first_audio_latency = time.perf_counter() - self.started
+            self.pipeline.record_first_audio(self.first_audio_latency)
+
+    def _result(self, future: Future) -> Optional[str]:
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Text to speech failed for a chunk: {str(e)}")
+            return None
+
+
+class SpeechPipeline:
+    """Sentence-chunked text to speech on a worker pool
+
+    ``synthesize(text, language)`` turns one chunk into an audio file path. Chunks
+    of an answer are synthesized concurrently; the whole answer is then joined into
+    one file: MP3 frames can simply be concatenated, WAV chunks are joined sample by
+    sample.
+    """
+
+    def __init__(self, synthesize: Callable[[str, str], str], audio_cache: AudioCache,
+                 workers: int = TTS_WORKERS, chunk_chars: int = TTS_CHUNK_CHARS):
+        self.synthesize = synthesize
+        self.audio_cache = audio_cache
+        self.chunk_chars = chunk_chars
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speech")
+        self._lock = threading.Lock()
+        self._stats = {"answers": 0, "chunks": 0, "spoken": 0, "first_audio_total": 0.0, "first_audio_max": 0.0}
+
+    def start(self, language: str, started: Optional[float] = None) -> SpeechJob:
+        """Begin the speech of an answer whose text will be fed as it streams in"""
+        with self._lock:
+            self._stats["answers"] += 1
+        return SpeechJob(self, language, started)
+
+    def speak(self, text: str, language: str) -> SpeechJob:
+        """Queue the speech of a complete text"""
+        job = self.start(language)
+        job.feed(text)
+        return job.close()
+
+    def submit(self, chunk: str, language: str) -> Future:
+        with self._lock:
+            self._stats["chunks"] += 1
+        return self._executor.submit(self.synthesize, chunk, language)
+
+    def concatenate(self, text: str, language: str, paths: List[str]) -> str:
+        """Join chunk files into one cached file for the whole text"""
+        suffixes = {os.path.splitext(path)[1] for path in paths}
+        if len(suffixes) > 1:
+            # A backend fell back to another one mid-answer; speak the whole text in one go instead
+            return self.synthesize(text, language)
+        suffix = suffixes.pop()
+
+        def write(target: str) -> None:
+            if suffix == ".wav":
+                _join_wav(paths, target)
+                return
+            with open(target, "wb") as out:
+                for path in paths:
+                    with open(path, "rb") as f:
+                        out.write(f.read())
+
+        # Chunk file names are their cache keys, which cover the voice settings
+        key = audio_key(text, language, {"chunks": [os.path.splitext(os.path.basename(path))[0] for path in paths]})
+        return self.audio_cache.get(key) or self.audio_cache.put(key, write, suffix)
+
+    def record_first_audio(self, latency: float) -> None:
+        with self._lock:
+            self._stats["spoken"] += 1
+            self._stats["first_audio_total"] += latency
+            self._stats["first_audio_max"] = max(self._stats["first_audio_max"], latency)
+
+    def stats(self) -> Dict:
+        """Answers and chunks spoken, and average and worst time to first audio"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["first_audio_avg"] = stats["first_audio_total"] / stats["spoken"] if stats["spoken"] else 0.0
+        return stats
+
+
+def audio_seconds(path: str) -> Optional[float]:
+    """Playing time of a WAV file; ``None`` for formats whose length is not in the header"""
+    if not path.endswith(".wav"):
+        return None
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def _join_wav(paths: List[str], target: str) -> None:
+    with wave.open(target, "wb") as out:
+        for i, path in enumerate(paths):
+            with wave.open(path, "rb") as part:
+                if i == 0:
+                    out.setparams(part.getparams())
+                out.writeframes(part.readframes(part.getnframes()))
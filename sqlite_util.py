@@ -0,0 +1,32 @@
+import sqlite3
+import threading
+from typing import Iterable
+
+
+class ThreadConnections:
+    """One autocommit SQLite connection per thread, opened in WAL mode on first use
+
+    Streamlit serves each session from its own thread, and a connection must not be
+    shared across threads, so each caller thread gets its own.
+    """
+
+    def __init__(self, path: str, pragmas: Iterable[str] = ()):
+        self.path = path
+        self.pragmas = ("journal_mode=WAL", "synchronous=NORMAL") + tuple(pragmas)
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close the calling thread's connection, if it opened one"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,712 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+from codec import Codec, canonical, decode, get_codec
+from config import DATA_DIR, JOURNAL_COMPACT_EVENTS, JOURNAL_FSYNC, SQLITE_PATH, STORAGE_BACKEND
+from journal import append_line, apply_event, event_sections, patch_event, read_events, repair_tail
+from sqlite_util import ThreadConnections
+
+# Top-level fields kept as indexed columns of the ``students`` table
+PROFILE_COLUMNS = ("name", "grade", "password", "joined_date", "last_active")
+
+
+class ConflictError(Exception):
+    """A compare-and-swap write found the record at a different version than expected"""
+
+    def __init__(self, student_id: str, expected, actual):
+        super().__init__(f"Student {student_id} was modified concurrently")
+        self.student_id = student_id
+        self.expected = expected
+        self.actual = actual
+
+
+# A section path addresses one independently stored part of a record: a top-level
+# key such as ("preferences",), or a single topic such as ("progress", subject, topic)
+SectionPath = Tuple[str, ...]
+
+
+def section_digests(data: Dict) -> Dict[SectionPath, str]:
+    """Map every section path of a record to a digest of its content"""
+    digests = {}
+    for key, value in data.items():
+        if key == "progress" and isinstance(value, dict) and all(isinstance(v, dict) for v in value.values()):
+            for subject, topics in value.items():
+                for topic, scores in topics.items():
+                    digests[("progress", subject, topic)] = _digest(scores)
+        else:
+            digests[(key,)] = _digest(value)
+    return digests
+
+
+def changed_sections(old: Dict[SectionPath, str], new: Dict[SectionPath, str]) -> set:
+    """Return the section paths that were added, modified or removed between two digest maps"""
+    changed = {path for path, digest in new.items() if old.get(path) != digest}
+    changed.update(path for path in old if path not in new)
+    return changed
+
+
+def get_section(data: Dict, path: SectionPath):
+    """Return the value stored at ``path``, or ``None`` when the section was removed"""
+    value = data
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _digest(value) -> str:
+    return hashlib.blake2b(canonical(value), digest_size=16).hexdigest()
+
+
+class StorageBackend:
+    """Interface for student record storage"""
+
+    name = "base"
+    location = None  # Directory or file the backend reads; reopened by worker processes
+
+    def exists(self, student_id: str) -> bool:
+        raise NotImplementedError
+
+    def load(self, student_id: str) -> Dict:
+        raise NotImplementedError
+
+    def save(self, student_id: str, data: Dict, changed: Optional[Iterable[SectionPath]] = None,
+             expected_version=None):
+        """Persist ``data`` and return the record's new version token
+
+        When ``changed`` is given only those section paths need writing. When
+        ``expected_version`` is given the write only happens if the stored record is
+        still at that version; otherwise ``ConflictError`` is raised.
+        """
+        raise NotImplementedError
+
+    def save_many(self, records: Iterable[Tuple[str, Dict]]) -> None:
+        """Fully save a batch of records, atomically where the backend supports it"""
+        for student_id, data in records:
+            self.save(student_id, data)
+
+    def append_event(self, student_id: str, event: Dict) -> Tuple[object, object]:
+        """Apply one journal event (see ``journal.py``) to a stored record
+
+        Returns the record's version tokens immediately before and after the event.
+        """
+        raise NotImplementedError
+
+    def version(self, student_id: str):
+        """Return a token that changes whenever the stored record changes, or ``None`` if it is missing"""
+        raise NotImplementedError
+
+    def ids(self) -> Iterator[str]:
+        """Yield the IDs of all stored students"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Return the number of stored students"""
+        return sum(1 for _ in self.ids())
+
+    def close(self) -> None:
+        pass
+
+
+class JSONStorage(StorageBackend):
+    """One encoded snapshot per student plus an append-only event journal
+
+    Every write after creation is a single line appended to ``<id>.journal``. Once a
+    journal grows past ``JOURNAL_COMPACT_EVENTS`` lines it is folded into the snapshot
+    on a background thread. Snapshots are replaced atomically and record the last
+    journal sequence number they contain, so replay after a crash at any point
+    rebuilds the same state. Writers hold a per-student lock that also excludes
+    other processes, so unrelated students never wait on each other.
+
+    Snapshots are written with ``codec`` and read back in whichever format they hold.
+    """
+
+    name = "json"
+
+    def __init__(self, data_dir: str = DATA_DIR, codec: Optional[Codec] = None):
+        self.data_dir = data_dir
+        self.location = data_dir
+        self.codec = codec or get_codec()
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # student_id -> (version token, last journal seq, journaled events since the snapshot)
+        self._journal_state = {}
+        self._compacting = set()
+
+    def exists(self, student_id: str) -> bool:
+        return os.path.exists(self._path(student_id))
+
+    def load(self, student_id: str) -> Dict:
+        with self._lock(student_id):
+            data, _ = self._replay(student_id)
+        return data
+
+    def save(self, student_id: str, data: Dict, changed: Optional[Iterable[SectionPath]] = None,
+             expected_version=None):
+        if changed is not None:
+            return self._append(student_id, patch_event(data, changed), expected_version)[1]
+
+        # A full save supersedes everything journaled so far
+        with self._lock(student_id):
+            self._check_version(student_id, expected_version)
+            last_seq = self._sequence(student_id) if self.exists(student_id) else 0
+            self._write_snapshot(student_id, data, last_seq)
+            for path in (self._journal_path(student_id), self._compacting_path(student_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+            current = self.version(student_id)
+            self._journal_state[student_id] = (current, last_seq, 0)
+        return current
+
+    def append_event(self, student_id: str, event: Dict) -> Tuple[object, object]:
+        """Record one event as a single appended journal line"""
+        return self._append(student_id, event)
+
+    def _append(self, student_id: str, event: Dict, expected_version=None) -> Tuple[object, object]:
+        with self._lock(student_id):
+            previous = self._check_version(student_id, expected_version)
+            seq = self._sequence(student_id) + 1
+            pending = self._journal_state[student_id][2] + 1
+            append_line(self._journal_path(student_id), dict(event, seq=seq), JOURNAL_FSYNC)
+            current = self.version(student_id)
+            self._journal_state[student_id] = (current, seq, pending)
+            schedule = pending >= JOURNAL_COMPACT_EVENTS and student_id not in self._compacting
+            if schedule:
+                self._compacting.add(student_id)
+        if schedule:
+            threading.Thread(target=self.compact, args=(student_id,), daemon=True).start()
+        return previous, current
+
+    def compact(self, student_id: str) -> None:
+        """Fold the journal of one student into a fresh snapshot"""
+        try:
+            journal_path = self._journal_path(student_id)
+            compacting_path = self._compacting_path(student_id)
+            with self._lock(student_id):
+                # New appends go to a fresh journal while the old one is folded in.
+                # A leftover file from an interrupted compaction is finished first.
+                if not os.path.exists(compacting_path):
+                    if not os.path.exists(journal_path):
+                        return
+                    os.replace(journal_path, compacting_path)
+                self._journal_state.pop(student_id, None)
+
+            data, last_seq = self._read_snapshot(student_id)
+            for event in read_events(compacting_path):
+                if event.get("seq", 0) > last_seq:
+                    apply_event(data, event)
+                    last_seq = event["seq"]
+
+            with self._lock(student_id):
+                # A full save in the meantime already superseded the folded events
+                if os.path.exists(compacting_path):
+                    self._write_snapshot(student_id, data, last_seq)
+                    os.remove(compacting_path)
+                self._journal_state.pop(student_id, None)
+        finally:
+            self._compacting.discard(student_id)
+
+    def version(self, student_id: str):
+        """Stat signature of the snapshot and journal files
+
+        Includes the inode because every snapshot write is an atomic replace with a new
+        file, so a rewrite of the same size within the clock's resolution still shows.
+        """
+        token = []
+        for path in (self._path(student_id), self._compacting_path(student_id), self._journal_path(student_id)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                if not token:
+                    return None
+                token.append(None)
+            else:
+                token.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        return tuple(token)
+
+    def ids(self) -> Iterator[str]:
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    yield entry.name[:-len(".json")]
+
+    def _check_version(self, student_id: str, expected_version):
+        """Compare-and-swap guard; caller holds the student lock"""
+        current = self.version(student_id)
+        if expected_version is not None and current != expected_version:
+            raise ConflictError(student_id, expected_version, current)
+        return current
+
+    def _replay(self, student_id: str) -> Tuple[Dict, int]:
+        """Rebuild a record from its snapshot and any journaled events; caller holds the student lock"""
+        version = self.version(student_id)
+        data, last_seq = self._read_snapshot(student_id)
+        pending = 0
+        for path in (self._compacting_path(student_id), self._journal_path(student_id)):
+            for event in read_events(path):
+                if event.get("seq", 0) > last_seq:
+                    apply_event(data, event)
+                    last_seq = event["seq"]
+                    pending += 1
+        self._journal_state[student_id] = (version, last_seq, pending)
+        return data, last_seq
+
+    def _read_snapshot(self, student_id: str) -> Tuple[Dict, int]:
+        with open(self._path(student_id), 'rb') as f:
+            data = decode(f.read())
+        return data, data.pop("_journal_seq", 0)
+
+    def _write_snapshot(self, student_id: str, data: Dict, last_seq: int) -> None:
+        """Atomically replace a snapshot; readers see either the old or the new file"""
+        path = self._path(student_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.codec.encode(dict(data, _journal_seq=last_seq)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _sequence(self, student_id: str) -> int:
+        """Last journal sequence number of a student; caller holds the student lock
+
+        The cached number is trusted only while the files are exactly as this process
+        last left them; after a write from another process the journal is rescanned.
+        """
+        state = self._journal_state.get(student_id)
+        if state is None or state[0] != self.version(student_id):
+            # Nobody can be mid-append while we hold the lock, so a torn tail is from a crash
+            repair_tail(self._journal_path(student_id))
+            self._replay(student_id)
+        return self._journal_state[student_id][1]
+
+    def _lock(self, student_id: str) -> "_StudentLock":
+        with self._locks_guard:
+            lock = self._locks.get(student_id)
+            if lock is None:
+                lock = self._locks[student_id] = _StudentLock(os.path.join(self.data_dir, f"{student_id}.lock"))
+            return lock
+
+    def _path(self, student_id: str) -> str:
+        return os.path.join(self.data_dir, f"{student_id}.json")
+
+    def _journal_path(self, student_id: str) -> str:
+        return os.path.join(self.data_dir, f"{student_id}.journal")
+
+    def _compacting_path(self, student_id: str) -> str:
+        return os.path.join(self.data_dir, f"{student_id}.journal.compacting")
+
+
+class _StudentLock:
+    """Re-entrant lock for one student that excludes other threads and other processes
+
+    The thread lock is taken first; the advisory file lock is held while the
+    outermost holder is inside, since file locks are not re-entrant per process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self) -> "_StudentLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                _lock_file(self._fd)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+
+if fcntl is not None:
+    def _lock_file(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_file(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+elif msvcrt is not None:
+    def _lock_file(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    def _lock_file(fd: int) -> None:
+        pass
+
+    def _unlock_file(fd: int) -> None:
+        pass
+
+
+class SQLiteStorage(StorageBackend):
+    """Embedded SQLite store with one row per profile field group, topic, badge and login record
+
+    Profile sections and topic histories are stored encoded with ``codec``; JSON
+    codecs store text so the database stays readable with the sqlite3 shell.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id  TEXT PRIMARY KEY,
+            name        TEXT,
+            grade       INTEGER,
+            password    TEXT,
+            joined_date TEXT,
+            last_active TEXT,
+            version     INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_students_last_active ON students(last_active);
+
+        CREATE TABLE IF NOT EXISTS profile (
+            student_id TEXT NOT NULL,
+            section    TEXT NOT NULL,
+            value      TEXT NOT NULL,
+            PRIMARY KEY (student_id, section)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS progress (
+            student_id TEXT NOT NULL,
+            subject    TEXT NOT NULL,
+            topic      TEXT NOT NULL,
+            scores     TEXT NOT NULL,
+            PRIMARY KEY (student_id, subject, topic)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_progress_subject_topic ON progress(subject, topic);
+
+        CREATE TABLE IF NOT EXISTS badges (
+            student_id TEXT NOT NULL,
+            position   INTEGER NOT NULL,
+            badge      TEXT NOT NULL,
+            PRIMARY KEY (student_id, position)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_badges_badge ON badges(badge);
+
+        CREATE TABLE IF NOT EXISTS login_tracking (
+            student_id   TEXT PRIMARY KEY,
+            last_login   TEXT,
+            login_streak INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_login_last_login ON login_tracking(last_login);
+    """
+
+    def __init__(self, path: str = SQLITE_PATH, codec: Optional[Codec] = None):
+        self.path = path
+        self.location = path
+        self.codec = codec or get_codec()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connections = ThreadConnections(self.path, pragmas=("foreign_keys=OFF",))
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        self._migrate(conn)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _connect(self, write: bool = False) -> "_Transaction":
+        return _Transaction(self._connection(), write)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Bring databases created by earlier versions up to the current schema"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(students)")}
+        if "version" not in columns:
+            conn.execute("ALTER TABLE students ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def exists(self, student_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM students WHERE student_id = ?", (student_id,)).fetchone()
+        return row is not None
+
+    def load(self, student_id: str) -> Dict:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(PROFILE_COLUMNS)} FROM students WHERE student_id = ?",
+                (student_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(student_id)
+            data = {column: value for column, value in zip(PROFILE_COLUMNS, row) if value is not None}
+
+            for section, value in conn.execute(
+                "SELECT section, value FROM profile WHERE student_id = ?", (student_id,)
+            ):
+                data[section] = decode(value)
+
+            progress = {}
+            for subject, topic, scores in conn.execute(
+                "SELECT subject, topic, scores FROM progress WHERE student_id = ?", (student_id,)
+            ):
+                progress.setdefault(subject, {})[topic] = decode(scores)
+            data["progress"] = progress
+
+            data["badges"] = [
+                badge for (badge,) in conn.execute(
+                    "SELECT badge FROM badges WHERE student_id = ? ORDER BY position", (student_id,)
+                )
+            ]
+
+            login = conn.execute(
+                "SELECT last_login, login_streak FROM login_tracking WHERE student_id = ?", (student_id,)
+            ).fetchone()
+            if login is not None:
+                data["login_tracking"] = {"last_login": login[0], "login_streak": login[1]}
+        return data
+
+    def save(self, student_id: str, data: Dict, changed: Optional[Iterable[SectionPath]] = None,
+             expected_version=None):
+        with self._connect(write=True) as conn:
+            if expected_version is not None:
+                current = self._current_version(conn, student_id)
+                if current != expected_version:
+                    raise ConflictError(student_id, expected_version, current)
+            if changed is not None:
+                self._write_changes(conn, student_id, data, changed)
+                self._bump_version(conn, student_id)
+            else:
+                self._replace_record(conn, student_id, data)
+            return self._current_version(conn, student_id)
+
+    def save_many(self, records: Iterable[Tuple[str, Dict]]) -> None:
+        """Save a batch of records in a single transaction"""
+        with self._connect(write=True) as conn:
+            for student_id, data in records:
+                self._replace_record(conn, student_id, data)
+
+    def append_event(self, student_id: str, event: Dict) -> Tuple[object, object]:
+        """Apply an event to just the rows it touches inside one transaction"""
+        paths = event_sections(event)
+        with self._connect(write=True) as conn:
+            data = self._read_sections(conn, student_id, paths)
+            apply_event(data, event)
+            self._write_changes(conn, student_id, data, paths)
+            previous = self._current_version(conn, student_id)
+            self._bump_version(conn, student_id)
+        return previous, previous + 1
+
+    def version(self, student_id: str):
+        """Write counter of the record, bumped in the same transaction as every change"""
+        with self._connect() as conn:
+            return self._current_version(conn, student_id)
+
+    def ids(self, page_size: int = 1000) -> Iterator[str]:
+        # Keyset pagination keeps at most one page of IDs in memory
+        last = ""
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT student_id FROM students WHERE student_id > ? ORDER BY student_id LIMIT ?",
+                    (last, page_size)
+                ).fetchall()
+            for (student_id,) in rows:
+                yield student_id
+            if len(rows) < page_size:
+                return
+            last = rows[-1][0]
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def active_since(self, timestamp: str) -> int:
+        """Count students whose ``last_active`` is at or after ``timestamp`` (ISO format)"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM students WHERE last_active >= ?", (timestamp,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        self._connections.close()
+
+    def _write_columns(self, conn: sqlite3.Connection, student_id: str, data: Dict) -> None:
+        values = [data.get(column) for column in PROFILE_COLUMNS]
+        conn.execute(
+            f"INSERT INTO students (student_id, {', '.join(PROFILE_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' for _ in PROFILE_COLUMNS)}) "
+            f"ON CONFLICT(student_id) DO UPDATE SET "
+            f"{', '.join(f'{column} = excluded.{column}' for column in PROFILE_COLUMNS)}",
+            [student_id] + values
+        )
+
+    def _replace_record(self, conn: sqlite3.Connection, student_id: str, data: Dict) -> None:
+        for table in ("profile", "progress", "badges", "login_tracking"):
+            conn.execute(f"DELETE FROM {table} WHERE student_id = ?", (student_id,))
+        self._write_columns(conn, student_id, data)
+        for section, value in data.items():
+            self._write_section(conn, student_id, section, value)
+        self._bump_version(conn, student_id)
+
+    def _current_version(self, conn: sqlite3.Connection, student_id: str) -> Optional[int]:
+        row = conn.execute("SELECT version FROM students WHERE student_id = ?", (student_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def _bump_version(self, conn: sqlite3.Connection, student_id: str) -> None:
+        conn.execute("UPDATE students SET version = version + 1 WHERE student_id = ?", (student_id,))
+
+    def _read_sections(self, conn: sqlite3.Connection, student_id: str, paths: Iterable[SectionPath]) -> Dict:
+        """Load only the parts of a record behind the given section paths"""
+        data = {}
+        for path in paths:
+            section = path[0]
+            if section in PROFILE_COLUMNS:
+                row = conn.execute(
+                    f"SELECT {', '.join(PROFILE_COLUMNS)} FROM students WHERE student_id = ?", (student_id,)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(student_id)
+                data.update((column, value) for column, value in zip(PROFILE_COLUMNS, row) if value is not None)
+            elif section == "progress" and len(path) == 3:
+                row = conn.execute(
+                    "SELECT scores FROM progress WHERE student_id = ? AND subject = ? AND topic = ?",
+                    (student_id, path[1], path[2])
+                ).fetchone()
+                if row is not None:
+                    data.setdefault("progress", {}).setdefault(path[1], {})[path[2]] = decode(row[0])
+            elif section == "badges":
+                data["badges"] = [
+                    badge for (badge,) in conn.execute(
+                        "SELECT badge FROM badges WHERE student_id = ? ORDER BY position", (student_id,)
+                    )
+                ]
+            elif section == "login_tracking":
+                row = conn.execute(
+                    "SELECT last_login, login_streak FROM login_tracking WHERE student_id = ?", (student_id,)
+                ).fetchone()
+                if row is not None:
+                    data["login_tracking"] = {"last_login": row[0], "login_streak": row[1]}
+            elif section != "progress":
+                row = conn.execute(
+                    "SELECT value FROM profile WHERE student_id = ? AND section = ?", (student_id, section)
+                ).fetchone()
+                if row is not None:
+                    data[section] = decode(row[0])
+        return data
+
+    def _write_changes(self, conn: sqlite3.Connection, student_id: str, data: Dict,
+                       changed: Iterable[SectionPath]) -> None:
+        """Write only the rows behind the given section paths"""
+        columns_written = False
+        for path in changed:
+            section = path[0]
+            if section in PROFILE_COLUMNS:
+                if not columns_written:
+                    self._write_columns(conn, student_id, data)
+                    columns_written = True
+            elif section == "progress" and len(path) == 3:
+                scores = get_section(data, path)
+                if scores is None:
+                    conn.execute(
+                        "DELETE FROM progress WHERE student_id = ? AND subject = ? AND topic = ?",
+                        (student_id, path[1], path[2])
+                    )
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO progress (student_id, subject, topic, scores) VALUES (?, ?, ?, ?)",
+                        (student_id, path[1], path[2], self._encode(scores))
+                    )
+            else:
+                table = {"progress": "progress", "badges": "badges", "login_tracking": "login_tracking"}.get(section)
+                if table:
+                    conn.execute(f"DELETE FROM {table} WHERE student_id = ?", (student_id,))
+                else:
+                    conn.execute("DELETE FROM profile WHERE student_id = ? AND section = ?", (student_id, section))
+                if section in data:
+                    self._write_section(conn, student_id, section, data[section])
+
+    def _encode(self, value):
+        encoded = self.codec.encode(value)
+        return encoded if self.codec.binary else encoded.decode("utf-8")
+
+    def _write_section(self, conn: sqlite3.Connection, student_id: str, section: str, value) -> None:
+        """Write one top-level section of a student record to its table"""
+        if section in PROFILE_COLUMNS:
+            return
+        if section == "progress":
+            conn.executemany(
+                "INSERT OR REPLACE INTO progress (student_id, subject, topic, scores) VALUES (?, ?, ?, ?)",
+                [
+                    (student_id, subject, topic, self._encode(scores))
+                    for subject, topics in (value or {}).items()
+                    for topic, scores in topics.items()
+                ]
+            )
+        elif section == "badges":
+            conn.executemany(
+                "INSERT INTO badges (student_id, position, badge) VALUES (?, ?, ?)",
+                [(student_id, position, badge) for position, badge in enumerate(value or [])]
+            )
+        elif section == "login_tracking" and isinstance(value, dict):
+            conn.execute(
+                "INSERT OR REPLACE INTO login_tracking (student_id, last_login, login_streak) VALUES (?, ?, ?)",
+                (student_id, value.get("last_login"), value.get("login_streak", 0))
+            )
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO profile (student_id, section, value) VALUES (?, ?, ?)",
+                (student_id, section, self._encode(value))
+            )
+
+
+class _Transaction:
+    """Context manager running a block in one transaction on an autocommit connection"""
+
+    def __init__(self, conn: sqlite3.Connection, write: bool = False):
+        self.conn = conn
+        self.write = write
+
+    def __enter__(self) -> sqlite3.Connection:
+        # Writers take the write lock up front so they never fail mid-transaction on upgrade
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+
+
+def open_backend(name: Optional[str] = None, location: Optional[str] = None,
+                 codec: Optional[Codec] = None) -> StorageBackend:
+    """Create the storage backend called ``name`` (defaults to ``config.STORAGE_BACKEND``)"""
+    name = name or STORAGE_BACKEND
+    if name == "json":
+        return JSONStorage(location or DATA_DIR, codec)
+    if name == "sqlite":
+        return SQLiteStorage(location or SQLITE_PATH, codec)
+    raise ValueError(f"Unknown storage backend: {name}")
@@ -1,77 +1,159 @@
-import json
+import hashlib
+import hmac
 import os
+import secrets
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
-import pandas as pd
-import seaborn as sns
+import cohort
+from codec import Codec
+from config import DATA_DIR, READ_CACHE_SIZE
+from journal import apply_event, badge_event, login_event, patch_event, score_event
+from mastery import MasteryIndex, canonical_subject
+from progress_history import ScoreHistory
+from storage import ConflictError, StorageBackend, changed_sections, open_backend, section_digests
 
-from config import DATA_DIR
+# Fields refreshed by every write; changing only these does not make a record dirty
+BOOKKEEPING_FIELDS = ("last_active", "study_streak")
+# Key under which records returned by get_student_data carry the version they were read at
+VERSION_FIELD = "_version"
+
+
+def new_student_record(name: str, grade: int, courses: List[str], password: Optional[str]) -> Dict:
+    """Build a student record in the current schema with default settings"""
+    return {
+        "name": name,
+        "grade": grade,
+        "courses": courses,
+        "password": password,  # Store password
+        "joined_date": datetime.now().isoformat(),
+        "last_active": datetime.now().isoformat(),
+        "progress": {},
+        "badges": [],
+        "preferences": {
+            "language": "en",
+            "difficulty_level": "medium"
+        },
+        "study_preferences": {
+            "weekly_hours": 20,
+            "preferred_times": ["Morning (9-12 PM)"],
+            "learning_styles": {
+                "visual": True,
+                "auditory": False,
+                "practical": False
+            }
+        },
+        "subject_priorities": {},
+        "weekly_progress": 0,
+        "topics_covered": 0,
+        "login_tracking": {
+            "last_login": None,
+            "login_streak": 0
+        }
+    }
+
+
+def new_reset_code() -> str:
+    """One-time code an administrator hands to a student to set a password"""
+    return secrets.token_urlsafe(9)
+
+
+def reset_code_digest(code: str) -> str:
+    """Digest stored in place of a reset code, so records never hold usable codes"""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
 
 
 class StudentManager:
-    def __init__(self):
-        """Initialize StudentManager"""
+    def __init__(self, backend: Optional[StorageBackend] = None, codec: Optional[Codec] = None):
+        """Initialize StudentManager with the configured storage backend and record codec"""
         self.data_dir = DATA_DIR
         os.makedirs(self.data_dir, exist_ok=True)
+        self.backend = backend or open_backend(codec=codec)
+        # Section digests of records keyed by (student_id, version) as read from or written to storage
+        self._snapshots = OrderedDict()
+        # Parsed records keyed by student ID, each tagged with the backend version it was read at
+        self._cache = OrderedDict()
+        self._cache_size = READ_CACHE_SIZE
+        self._cache_lock = threading.Lock()
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        # Mastery indexes keyed by student ID, each valid for the backend version it records
+        self._mastery = OrderedDict()
 
     def create_student(self, student_id: str, name: str, grade: int, courses: List[str], password: str) -> bool:
         """Create a new student record"""
         if self.student_exists(student_id):
             return False
 
-        student_data = {
-            "name": name,
-            "grade": grade,
-            "courses": courses,
-            "password": password,  # Store password
-            "joined_date": datetime.now().isoformat(),
-            "last_active": datetime.now().isoformat(),
-            "progress": {},
-            "badges": [],
-            "preferences": {
-                "language": "en",
-                "difficulty_level": "medium"
-            },
-            "study_preferences": {
-                "weekly_hours": 20,
-                "preferred_times": ["Morning (9-12 PM)"],
-                "learning_styles": {
-                    "visual": True,
-                    "auditory": False,
-                    "practical": False
-                }
-            },
-            "subject_priorities": {},
-            "weekly_progress": 0,
-            "topics_covered": 0,
-            "login_tracking": {
-                "last_login": None,
-                "login_streak": 0
-            }
-        }
+        student_data = new_student_record(name, grade, courses, password)
 
         self._save_student_data(student_id, student_data)
         return True
 
     def student_exists(self, student_id: str) -> bool:
         """Check if a student exists"""
-        return os.path.exists(self._get_student_file_path(student_id))
+        return self.backend.exists(student_id)
 
     def get_student_data(self, student_id: str) -> Dict:
-        """Get student data"""
-        if not self.student_exists(student_id):
+        """Get student data, served from the read cache while the stored record is unchanged
+
+        The returned record carries the version it was read at under ``VERSION_FIELD``
+        so a later update can detect and merge writes made in between.
+        """
+        version = self.backend.version(student_id)
+        if version is None:
             raise ValueError(f"Student {student_id} not found")
 
-        with open(self._get_student_file_path(student_id), 'r') as f:
-            return json.load(f)
+        with self._cache_lock:
+            entry = self._cache.get(student_id)
+            if entry is not None and entry[0] == version:
+                self._cache.move_to_end(student_id)
+                self._cache_stats["hits"] += 1
+                return dict(_clone(entry[1]), **{VERSION_FIELD: version})
+            self._cache_stats["misses"] += 1
+
+        # Take the version before loading: a write in between makes it stale, never too new
+        data = self.backend.load(student_id)
+        digests = section_digests(data)
+        with self._cache_lock:
+            self._remember(self._snapshots, (student_id, version), digests)
+            if self._cache_size > 0:
+                self._remember(self._cache, student_id, (version, data))
+                data = _clone(data)
+        data[VERSION_FIELD] = version
+        return data
 
-    def update_student_data(self, student_id: str, data: Dict) -> None:
-        """Update student data"""
+    def cache_stats(self) -> Dict[str, int]:
+        """Get read cache counters"""
+        with self._cache_lock:
+            return dict(self._cache_stats, size=len(self._cache), capacity=self._cache_size)
+
+    def update_student_data(self, student_id: str, data: Dict, retries: int = 3) -> None:
+        """Update student data, writing only the sections changed since it was loaded
+
+        If another session wrote the record in the meantime, its changes to other
+        sections are merged into ``data`` and the write is retried; ``ConflictError``
+        is raised when both sessions changed the same section differently.
+        """
         if not self.student_exists(student_id):
             raise ValueError(f"Student {student_id} not found")
 
+        # Skip the write entirely when nothing but bookkeeping fields differ
+        base_version = data.pop(VERSION_FIELD, None)
+        with self._cache_lock:
+            snapshot = self._snapshots.get((student_id, base_version)) if base_version is not None else None
+        digests = section_digests(data)
+        changed = None
+        if snapshot is not None:
+            changed = {
+                path for path in changed_sections(snapshot, digests)
+                if path[0] not in BOOKKEEPING_FIELDS
+            }
+            if not changed:
+                data[VERSION_FIELD] = base_version
+                return
+
         # Update last active timestamp
         data["last_active"] = datetime.now().isoformat()
         
@@ -83,40 +165,74 @@ class StudentManager:
         else:
             data["study_streak"] = 0
 
-        self._save_student_data(student_id, data)
+        if changed is None:
+            # Without a known base version the whole record is written; last writer wins
+            self._save_student_data(student_id, data)
+            return
+        changed.update((field,) for field in BOOKKEEPING_FIELDS)
+        self._save_merged(student_id, data, changed, snapshot, base_version, retries)
 
-    def get_recommended_topics(self, student_id: str, subject: str) -> List[str]:
-        """Get recommended topics based on student's performance"""
-        student_data = self.get_student_data(student_id)
-        if not student_data or "progress" not in student_data:
-            return []
-        
-        subject_progress = student_data["progress"].get(subject, {})
-        recommended = []
-        
-        # Get all topics for the subject
-        topics = {
-            "programming": ["Python", "Java", "C++", "JavaScript", "SQL"],
-            "web_development": ["HTML/CSS", "React", "Node.js", "MongoDB", "APIs"],
-            "data_science": ["Machine Learning", "Deep Learning", "Computer Vision", "NLP", "AI Ethics"],
-            "computer_science": ["Algorithms", "Data Structures", "Operating Systems", "Computer Networks", "Database Systems"]
-        }
-        
-        subject_topics = topics.get(subject, [])
-        
-        for topic in subject_topics:
-            if topic in subject_progress:
-                # Calculate average score for the topic
-                scores = subject_progress[topic]
-                if isinstance(scores, list) and scores:
-                    avg_score = sum(scores) / len(scores)
-                    if avg_score < 0.7:  # Topics with less than 70% mastery
-                        recommended.append(topic)
+    def mutate(self, student_id: str, change: Callable[[Dict], None], retries: int = 3) -> Dict:
+        """Apply ``change`` to a fresh copy of the record and save it, rereading and
+        reapplying it if a concurrent session changed the same sections"""
+        for attempt in range(retries + 1):
+            data = self.get_student_data(student_id)
+            change(data)
+            try:
+                self.update_student_data(student_id, data, retries)
+                return data
+            except ConflictError:
+                if attempt == retries:
+                    raise
+
+    def update_preferences(self, student_id: str, **preferences) -> Dict:
+        """Update individual preference settings without overwriting other sessions' changes"""
+        return self.mutate(student_id, lambda data: data.setdefault("preferences", {}).update(preferences))
+
+    def issue_reset_code(self, student_id: str) -> str:
+        """Lock the account until its student sets a new password with the returned one-time code"""
+        code = new_reset_code()
+        self.mutate(student_id, lambda data: data.update(needs_password_reset=True,
+                                                         password_reset_code=reset_code_digest(code)))
+        return code
+
+    def check_reset_code(self, student_id: str, code: str) -> bool:
+        """Whether ``code`` is the reset code issued for the account"""
+        expected = self.get_student_data(student_id).get("password_reset_code")
+        if not expected or not code:
+            return False
+        return hmac.compare_digest(expected, reset_code_digest(code))
+
+    def set_password(self, student_id: str, password: str) -> Dict:
+        """Set a new password and use up the account's reset code"""
+        return self.mutate(student_id, lambda data: data.update(password=password, needs_password_reset=False,
+                                                                password_reset_code=None))
+
+    def record_score(self, student_id: str, subject: str, topic: str, score: float) -> None:
+        """Append a practice score to a topic's history"""
+        subject = canonical_subject(subject)
+        previous, current = self._append_event(student_id, score_event(subject, topic, score))
+
+        # Keep the mastery index in step without rereading the record
+        with self._cache_lock:
+            index = self._mastery.get(student_id)
+            if index is not None and index.version == previous:
+                index.record(subject, topic, score)
+                index.version = current
             else:
-                # If topic hasn't been attempted yet
-                recommended.append(topic)
-        
-        return recommended[:3]  # Return top 3 recommendations
+                self._mastery.pop(student_id, None)
+
+    def record_login(self, student_id: str) -> None:
+        """Record a login and update the login streak"""
+        self._append_event(student_id, login_event())
+
+    def award_badge(self, student_id: str, badge: str) -> None:
+        """Unlock a badge for the student; awarding it again has no effect"""
+        self._append_event(student_id, badge_event(badge))
+
+    def get_recommended_topics(self, student_id: str, subject: str) -> List[str]:
+        """Get up to three unattempted or weakest topics of a subject"""
+        return self._mastery_index(student_id).recommend(subject, limit=3)
 
     def generate_performance_report(self, student_id: str) -> Union[str, Dict]:
         """Generate a performance report for the student"""
@@ -129,12 +245,23 @@ class StudentManager:
         if not progress_data:
             return "No progress data available yet"
 
+        # Plotting libraries are slow to import and only needed here
+        import matplotlib.pyplot as plt
+        import pandas as pd
+        import seaborn as sns
+
         # Create visualization
         plt.figure(figsize=(12, 6))
         
+        # Topic mastery from the running averages of each score history
+        mastery = {
+            subject: {topic: ScoreHistory.from_value(scores).mastery for topic, scores in topics.items()}
+            for subject, topics in progress_data.items()
+        }
+
         # Progress by subject
         subject_progress = []
-        for subject, topics in progress_data.items():
+        for subject, topics in mastery.items():
             avg_progress = sum(topics.values()) / len(topics) if topics else 0
             subject_progress.append({
                 "Subject": subject,
@@ -158,7 +285,7 @@ class StudentManager:
         total_topics = sum(len(topics) for topics in progress_data.values())
         completed_topics = sum(
             sum(1 for score in topics.values() if score >= 0.8)
-            for topics in progress_data.values()
+            for topics in mastery.values()
         )
         
         summary = f"""
@@ -172,9 +299,9 @@ class StudentManager:
         #### 🎯 Subject Progress
         """
         
-        for subject in progress_data:
-            topic_count = len(progress_data[subject])
-            avg_progress = sum(progress_data[subject].values()) / topic_count if topic_count > 0 else 0
+        for subject in mastery:
+            topic_count = len(mastery[subject])
+            avg_progress = sum(mastery[subject].values()) / topic_count if topic_count > 0 else 0
             summary += f"\n- **{subject}**: {avg_progress:.1%} complete"
 
         return {
@@ -182,11 +309,96 @@ class StudentManager:
             "report_file": report_file
         }
 
-    def _get_student_file_path(self, student_id: str) -> str:
-        """Get the file path for student data"""
-        return os.path.join(self.data_dir, f"{student_id}.json")
+    def iter_students(self) -> Iterator[Tuple[str, Dict]]:
+        """Lazily yield ``(student_id, data)`` for every student, one record in memory at a time"""
+        return cohort.iter_records(self.backend)
+
+    def aggregate_cohort(self, active_days: int = 7, workers: Optional[int] = None) -> Dict:
+        """Compute per-subject score distributions, active users and login streaks across all students"""
+        return cohort.aggregate(self.backend, active_days=active_days, workers=workers)
+
+    def student_count(self) -> int:
+        """Get the number of registered students"""
+        return self.backend.count()
+
+    def _mastery_index(self, student_id: str) -> MasteryIndex:
+        """Get the student's mastery index, rebuilding it if the record changed elsewhere"""
+        version = self.backend.version(student_id)
+        with self._cache_lock:
+            index = self._mastery.get(student_id)
+            if index is not None and index.version == version:
+                self._mastery.move_to_end(student_id)
+                return index
+
+        index = MasteryIndex(self.get_student_data(student_id).get("progress", {}), version)
+        with self._cache_lock:
+            self._remember(self._mastery, student_id, index)
+        return index
+
+    def _append_event(self, student_id: str, event: Dict) -> Tuple[object, object]:
+        """Record one event without rewriting the rest of the student record"""
+        if not self.student_exists(student_id):
+            raise ValueError(f"Student {student_id} not found")
+        versions = self.backend.append_event(student_id, event)
+        self._invalidate(student_id)
+        return versions
+
+    def _save_student_data(self, student_id: str, data: Dict, changed: Optional[set] = None,
+                           expected_version=None) -> None:
+        """Save student data to the storage backend and remember what was written"""
+        data.pop(VERSION_FIELD, None)
+        version = self.backend.save(student_id, data, changed, expected_version)
+        self._invalidate(student_id)
+        with self._cache_lock:
+            self._remember(self._snapshots, (student_id, version), section_digests(data))
+        data[VERSION_FIELD] = version
+
+    def _save_merged(self, student_id: str, data: Dict, changed: set, base: Dict,
+                     base_version, retries: int) -> None:
+        """Compare-and-swap the changed sections, three-way merging concurrent writes between attempts"""
+        ours = section_digests(data)
+        for attempt in range(retries + 1):
+            try:
+                self._save_student_data(student_id, data, changed, base_version)
+                return
+            except ConflictError:
+                if attempt == retries:
+                    raise
+
+            base_version = self.backend.version(student_id)
+            current = self.backend.load(student_id)
+            current_digests = section_digests(current)
+            theirs = {
+                path for path in changed_sections(base, current_digests)
+                if path[0] not in BOOKKEEPING_FIELDS
+            }
+            overlap = [path for path in theirs & changed if current_digests.get(path) != ours.get(path)]
+            if overlap:
+                raise ConflictError(student_id, base_version, self.backend.version(student_id))
+            # Take over the other session's sections so ``data`` matches what will be stored
+            apply_event(data, patch_event(current, theirs - changed))
+            base = current_digests
+
+    def _invalidate(self, student_id: str) -> None:
+        """Drop the cached copy of a record after writing it"""
+        with self._cache_lock:
+            if self._cache.pop(student_id, None) is not None:
+                self._cache_stats["invalidations"] += 1
+
+    def _remember(self, entries: OrderedDict, student_id: str, value) -> None:
+        """Insert into an LRU map, evicting the least recently used entries; caller holds the cache lock"""
+        entries[student_id] = value
+        entries.move_to_end(student_id)
+        while len(entries) > max(self._cache_size, 1):
+            entries.popitem(last=False)
+            if entries is self._cache:
+                self._cache_stats["evictions"] += 1
+
 
-    def _save_student_data(self, student_id: str, data: Dict) -> None:
-        """Save student data to file"""
-        with open(self._get_student_file_path(student_id), 'w') as f:
-            json.dump(data, f, indent=4) 
\ No newline at end of file
+def _clone(value):
+    """Deep-copy a JSON-shaped value; much cheaper than ``copy.deepcopy`` for plain dicts and lists"""
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    return value 
\ No newline at end of file
@@ -2,10 +2,6 @@ import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 
-import matplotlib.pyplot as plt
-import numpy as np
-import seaborn as sns
-
 
 class StudyPlanner:
     def __init__(self):
@@ -137,8 +133,7 @@ class StudyPlanner:
         weights = {"High": 0.6, "Medium": 0.3, "Low": 0.1}
         subjects = list(priorities.keys())
         probabilities = [weights[priorities[s]] for s in subjects]
-        probabilities = np.array(probabilities) / sum(probabilities)
-        return np.random.choice(subjects, p=probabilities)
+        return random.choices(subjects, weights=probabilities)[0]
 
     def _get_topic_for_subject(self, subject: str) -> str:
         """Get appropriate topic for the subject"""
@@ -205,6 +200,10 @@ class StudyPlanner:
         # Calculate overall progress
         overall_progress = sum(self.progress_metrics["topic_mastery"].values()) / len(self.progress_metrics["topic_mastery"]) if self.progress_metrics["topic_mastery"] else 0
         
+        # Plotting libraries are slow to import and only needed here
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         # Generate visualizations
         plt.figure(figsize=(15, 10))
         
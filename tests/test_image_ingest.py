@@ -0,0 +1,47 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+from image_ingest import ImageIngestor, ImageRejected  # noqa: E402
+
+
+def worksheet(numbers, size=(3000, 4000)):
+    """A page of arithmetic questions; only ``numbers`` differ between pages"""
+    page = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(page)
+    for row, number in enumerate(numbers):
+        draw.text((200, 200 + row * 300), f"Question {row + 1}:  {number} x 7 = ?", fill="black",
+                  font_size=30 + row * 5)
+    return page
+
+
+def encode(image, image_format, **options):
+    out = io.BytesIO()
+    image.save(out, format=image_format, **options)
+    return out.getvalue()
+
+
+def test_same_layout_with_different_content_does_not_match():
+    ingestor = ImageIngestor()
+    original = ingestor.ingest(encode(worksheet([12, 34, 56, 78, 90, 21, 43]), "JPEG", quality=95))
+    one_digit = ingestor.ingest(encode(worksheet([12, 34, 56, 79, 90, 21, 43]), "JPEG", quality=95))
+    all_numbers = ingestor.ingest(encode(worksheet([98, 76, 54, 32, 10, 87, 65]), "JPEG", quality=95))
+    assert len({original.hash, one_digit.hash, all_numbers.hash}) == 3
+
+
+def test_identical_pixels_share_a_hash():
+    ingestor = ImageIngestor()
+    page = worksheet([1, 2, 3])
+    first = ingestor.ingest(encode(page, "PNG"))
+    again = ingestor.ingest(encode(page, "PNG", compress_level=1))
+    assert first.hash == again.hash
+
+
+def test_rejects_files_that_are_not_images():
+    ingestor = ImageIngestor()
+    with pytest.raises(ImageRejected):
+        ingestor.ingest(b"not an image")
+    assert ingestor.cache_stats()["rejected"] == 1
@@ -0,0 +1,164 @@
+import functools
+import importlib.util
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+from audio_cache import AudioCache, audio_key
+from config import ESPEAK_SPEED, LANGUAGES, TTS_BACKENDS, TTS_LANGUAGE_BACKENDS, TTS_SLOW, TTS_TLD
+
+
+class TTSBackend:
+    """Interface for a text to speech engine
+
+    ``voices`` maps the app's language codes to the engine's own voice or language
+    names; languages missing from it are not spoken by the engine.
+    """
+
+    name = ""
+    suffix = ".mp3"
+    voices: Dict[str, str] = {}
+
+    def available(self) -> bool:
+        """Whether the engine is installed"""
+        return True
+
+    def supports(self, language: str) -> bool:
+        return language in self.voices
+
+    def settings(self) -> Dict:
+        """Everything that changes how the engine sounds, for audio cache keys"""
+        return {"engine": self.name}
+
+    def synthesize(self, text: str, language: str, path: str) -> None:
+        """Write speech of ``text`` to ``path``"""
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate's speech through ``gTTS``; needs network access"""
+
+    name = "gtts"
+    suffix = ".mp3"
+    voices = {"en": "en", "es": "es", "fr": "fr", "de": "de", "zh": "zh-CN", "hi": "hi", "ar": "ar", "ru": "ru"}
+
+    def __init__(self, slow: bool = TTS_SLOW, tld: str = TTS_TLD):
+        self.slow = slow
+        self.tld = tld
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("gtts") is not None
+
+    def settings(self) -> Dict:
+        return {"engine": self.name, "slow": self.slow, "tld": self.tld}
+
+    def synthesize(self, text: str, language: str, path: str) -> None:
+        from gtts import gTTS
+
+        gTTS(text=text, lang=self.voices[language], slow=self.slow, tld=self.tld).save(path)
+
+
+class EspeakBackend(TTSBackend):
+    """Local espeak-ng (or espeak) speech; works offline and answers in milliseconds"""
+
+    name = "espeak"
+    suffix = ".wav"
+    voices = {"en": "en-us", "es": "es", "fr": "fr-fr", "de": "de", "zh": "cmn", "hi": "hi", "ar": "ar", "ru": "ru"}
+
+    def __init__(self, speed: int = ESPEAK_SPEED, executable: Optional[str] = None):
+        self.speed = speed
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self) -> bool:
+        return self.executable is not None
+
+    def settings(self) -> Dict:
+        return {"engine": self.name, "speed": self.speed}
+
+    def synthesize(self, text: str, language: str, path: str) -> None:
+        subprocess.run(
+            [self.executable, "-v", self.voices[language], "-s", str(self.speed), "-w", path, "--stdin"],
+            input=text.encode("utf-8"), capture_output=True, check=True, timeout=60,
+        )
+
+
+BACKENDS = {backend.name: backend for backend in (GTTSBackend, EspeakBackend)}
+
+
+def open_tts_backends(names: Optional[List[str]] = None) -> List[TTSBackend]:
+    """Create the installed backends among ``names`` (defaults to ``config.TTS_BACKENDS``), in order"""
+    backends = []
+    for name in names or TTS_BACKENDS:
+        name = name.strip()
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown text to speech backend: {name}")
+        backend = BACKENDS[name]()
+        if backend.available():
+            backends.append(backend)
+    return backends
+
+
+class TTSRouter:
+    """Speaks each language with the first backend that supports it, falling back on failure
+
+    Backends are tried in ``backends`` order unless ``language_backends`` gives a
+    language its own order. Audio is cached per backend and voice settings.
+    """
+
+    def __init__(self, backends: List[TTSBackend], audio_cache: AudioCache,
+                 language_backends: Optional[Dict[str, List[str]]] = None):
+        self.backends = backends
+        self.audio_cache = audio_cache
+        self.language_backends = TTS_LANGUAGE_BACKENDS if language_backends is None else language_backends
+        self._lock = threading.Lock()
+        self._stats = {backend.name: {"calls": 0, "failures": 0, "seconds": 0.0} for backend in backends}
+
+    def route(self, language: str) -> List[TTSBackend]:
+        """Backends able to speak a language, most preferred first"""
+        candidates = [backend for backend in self.backends if backend.supports(language)]
+        order = self.language_backends.get(language)
+        if order:
+            candidates.sort(key=lambda backend: order.index(backend.name) if backend.name in order else len(order))
+        return candidates
+
+    def speak(self, text: str, language: str) -> str:
+        """Path of the cached audio of ``text``, synthesizing it on a miss"""
+        error = None
+        for backend in self.route(language):
+            key = audio_key(text, language, backend.settings())
+            path = self.audio_cache.get(key)
+            if path is not None:
+                return path
+            started = time.perf_counter()
+            try:
+                path = self.audio_cache.put(key, functools.partial(backend.synthesize, text, language), backend.suffix)
+            except Exception as e:
+                print(f"Text to speech with {backend.name} failed: {str(e)}")
+                error = e
+                self._record(backend, started, failed=True)
+                continue
+            self._record(backend, started)
+            return path
+        if error is not None:
+            raise error
+        raise ValueError(f"No text to speech backend for {LANGUAGES.get(language, language)}")
+
+    def stats(self) -> Dict:
+        """Calls, failures and average synthesis seconds per backend"""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            done = values["calls"] - values["failures"]
+            values["avg_seconds"] = values["seconds"] / done if done else 0.0
+        return stats
+
+    def _record(self, backend: TTSBackend, started: float, failed: bool = False) -> None:
+        with self._lock:
+            stats = self._stats[backend.name]
+            stats["calls"] += 1
+            if failed:
+                stats["failures"] += 1
+            else:
+                stats["seconds"] += time.perf_counter() - started